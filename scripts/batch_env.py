@@ -0,0 +1,301 @@
+import random as r
+from typing import Dict, Tuple, List, Optional
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+# Import the shared rule tables so the batched game plays by the same numbers
+from game_data import GRID_SIZE, WALK_STEPS, WEAPON_DAMAGE, WEAPON_STATUS_EFFECTS, WEAPON_LIST, ARMOUR_LIST, MAX_ENEMY_DENSITY, CHEST_DENSITY
+from levelgenerator import generate_random_walk_dungeon, find_entrance, generate_entities
+
+# --- Batched Environment Constants ---
+
+# Action ids accepted by BatchGameEnv.step (one per environment)
+ACTION_UP: int = 0      # 'W'
+ACTION_DOWN: int = 1    # 'S'
+ACTION_LEFT: int = 2    # 'A'
+ACTION_RIGHT: int = 3   # 'D'
+ACTION_ATTACK: int = 4  # 'A' inside a fight
+ACTION_DEFEND: int = 5  # 'D' inside a fight
+ACTION_RUN: int = 6     # 'R' at the encounter prompt
+ACTION_FIGHT: int = 7   # 'F' at the encounter prompt
+NUM_ACTIONS: int = 8
+
+# Movement deltas (dy, dx) indexed by action id; non-movement actions do not move
+ACTION_DY: npt.NDArray[np.int_] = np.array([-1, 1, 0, 0, 0, 0, 0, 0], dtype=np.int16)
+ACTION_DX: npt.NDArray[np.int_] = np.array([0, 0, -1, 1, 0, 0, 0, 0], dtype=np.int16)
+
+# Observation codes layered on top of the map key (0:Wall, 1:Floor, 2:Entrance, 3:Chest, 4:Exit)
+OBS_ENEMY: int = 5
+OBS_PLAYER: int = 6
+
+# Game modes per environment
+MODE_PLAYING: int = 0
+MODE_ENCOUNTER: int = 1 # At the (F)ight or (R)un prompt
+MODE_FIGHT: int = 2     # Inside fight(), at the (A)ttack or (D)efend prompt
+
+# Items are stored as indexes into this list ("Fists" first so zeros mean unarmed)
+ITEM_NAMES: List[str] = ["Fists"] + [w for w in WEAPON_LIST if w != "Fists"] + ARMOUR_LIST
+ITEM_IDS: Dict[str, int] = {name: i for i, name in enumerate(ITEM_NAMES)}
+
+# Per-item lookup tables built from the weapon dictionaries (armour entries are never equipped as weapons)
+ITEM_BASE_DAMAGE: npt.NDArray[np.int_] = np.array([WEAPON_DAMAGE.get(n, (1, 1))[0] for n in ITEM_NAMES], dtype=np.int16)
+ITEM_CRIT_DAMAGE: npt.NDArray[np.int_] = np.array([WEAPON_DAMAGE.get(n, (1, 1))[1] for n in ITEM_NAMES], dtype=np.int16)
+ITEM_POISONS: npt.NDArray[np.bool_] = np.array([WEAPON_STATUS_EFFECTS.get(n, "None") == "Poisoned" for n in ITEM_NAMES])
+ITEM_IS_WEAPON: npt.NDArray[np.bool_] = np.array([n in WEAPON_LIST for n in ITEM_NAMES])
+IRON_ARMOUR_ID: int = ITEM_IDS["Iron Armour"]
+
+def entity_capacity(grid_size: int, walk_steps: int) -> Tuple[int, int]:
+    """Most enemies and chests generate_entities can place on a random walk map of this size, at any level.
+
+    The walk carves at most its 3x3 start plus one tile per step, and the counts use the
+    same formulas as generate_entities with the highest density targets.
+    """
+    max_floor = min(grid_size * grid_size, walk_steps + 9)
+    max_enemies = min(max(1, round(max_floor * MAX_ENEMY_DENSITY)), max_floor // 3)
+    max_chests = min(max(1, round(max_floor * CHEST_DENSITY)), max_floor // 4)
+    return max(1, max_enemies), max(1, max_chests)
+
+
+class BatchGameEnv:
+    """Gym-style environment that steps N independent games at once.
+
+    All game state lives in batched NumPy arrays so a single step() call advances every
+    environment with vectorized versions of Player.move, the collision checks in
+    update_game_state, Chest.open and the fight rules. Found weapons are always equipped.
+    The encounter prompts are answered by the next actions, as in enemy_encounter: first
+    Fight or Run (anything else asks again), then Attack or Defend until the fight ends
+    (anything else loses the turn, like fight()'s invalid action).
+    """
+
+    def __init__(self, num_envs: int, grid_size: int = GRID_SIZE, walk_steps: int = WALK_STEPS, seed: Optional[int] = None) -> None:
+        self.num_envs: int = num_envs
+        self.grid_size: int = grid_size
+        self.walk_steps: int = walk_steps
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        # Entity slots per environment, sized so no generated level has to drop entities
+        self.max_enemies, self.max_chests = entity_capacity(grid_size, walk_steps)
+        if seed is not None:
+            # Level generation uses the random module, seed it too for reproducible runs
+            r.seed(seed)
+
+        n = num_envs
+        self.maps: npt.NDArray[np.int8] = np.zeros((n, grid_size, grid_size), dtype=np.int8)
+        self.player_y: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int16)
+        self.player_x: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int16)
+        self.player_health: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int16)
+        self.player_max_health: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int16)
+        self.weapon: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int8)
+        self.has_iron_armour: npt.NDArray[np.bool_] = np.zeros(n, dtype=bool)
+        self.level: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int32)
+        self.mode: npt.NDArray[np.int_] = np.zeros(n, dtype=np.int8)
+        self.current_enemy: npt.NDArray[np.int_] = np.full(n, -1, dtype=np.int8)
+
+        # Enemies padded to max_enemies; empty slots have zero health and never collide
+        self.enemy_y: npt.NDArray[np.int_] = np.zeros((n, self.max_enemies), dtype=np.int16)
+        self.enemy_x: npt.NDArray[np.int_] = np.zeros((n, self.max_enemies), dtype=np.int16)
+        self.enemy_health: npt.NDArray[np.int_] = np.zeros((n, self.max_enemies), dtype=np.int16)
+        self.enemy_poison: npt.NDArray[np.int_] = np.zeros((n, self.max_enemies), dtype=np.int16)
+
+        # Chests padded to max_chests; empty slots start opened
+        self.chest_y: npt.NDArray[np.int_] = np.zeros((n, self.max_chests), dtype=np.int16)
+        self.chest_x: npt.NDArray[np.int_] = np.zeros((n, self.max_chests), dtype=np.int16)
+        self.chest_item: npt.NDArray[np.int_] = np.zeros((n, self.max_chests), dtype=np.int8)
+        self.chest_opened: npt.NDArray[np.bool_] = np.ones((n, self.max_chests), dtype=bool)
+
+        self._env_index: npt.NDArray[np.int_] = np.arange(n)
+
+    # --- Level and episode setup ---
+
+    def _load_level(self, i: int) -> None:
+        """Generates a fresh level for environment i (the batched transition_to_next_level)."""
+        dungeon_map = generate_random_walk_dungeon(self.grid_size, self.walk_steps)
+        self.maps[i] = dungeon_map
+        self.player_y[i], self.player_x[i] = find_entrance(dungeon_map)
+
+        # self.level[i] is still the level being left, like state.level in transition_to_next_level
+        enemies, chests = generate_entities(dungeon_map, int(self.level[i]) + 1)
+        if len(enemies) > self.max_enemies or len(chests) > self.max_chests:
+            raise ValueError(f"Level has {len(enemies)} enemies and {len(chests)} chests, "
+                             f"more than the {self.max_enemies}/{self.max_chests} slots per environment")
+        self.enemy_health[i] = 0
+        self.enemy_poison[i] = 0
+        for slot, enemy in enumerate(enemies):
+            self.enemy_y[i, slot], self.enemy_x[i, slot] = enemy.y, enemy.x
+            self.enemy_health[i, slot] = enemy.health
+
+        self.chest_opened[i] = True
+        for slot, chest in enumerate(chests):
+            self.chest_y[i, slot], self.chest_x[i, slot] = chest.y, chest.x
+            self.chest_item[i, slot] = ITEM_IDS.get(chest.item, IRON_ARMOUR_ID)
+            self.chest_opened[i, slot] = False
+
+        self.level[i] += 1
+        self.mode[i] = MODE_PLAYING
+        self.current_enemy[i] = -1
+
+    def _reset_env(self, i: int) -> None:
+        """Starts a new game in environment i with a fresh player."""
+        self.player_health[i] = 5
+        self.player_max_health[i] = 5
+        self.weapon[i] = ITEM_IDS["Fists"]
+        self.has_iron_armour[i] = False
+        self.level[i] = 0
+        self._load_level(i)
+
+    def reset(self) -> npt.NDArray[np.int8]:
+        """Resets every environment and returns the (N, H, W) observation tensor."""
+        for i in range(self.num_envs):
+            self._reset_env(i)
+        return self.observe()
+
+    # --- Observation ---
+
+    def observe(self) -> npt.NDArray[np.int8]:
+        """Returns the maps with chests, living enemies and the player overlayed, shape (N, H, W)."""
+        obs = self.maps.copy()
+        flat = obs.reshape(self.num_envs, -1)
+        width = self.grid_size
+
+        # Same layering as print_grid: chests, then enemies over them, then the player on top
+        closed = ~self.chest_opened
+        rows = np.broadcast_to(self._env_index[:, None], closed.shape)
+        flat[rows[closed], (self.chest_y.astype(np.intp) * width + self.chest_x)[closed]] = 3
+
+        alive = self.enemy_health > 0
+        rows = np.broadcast_to(self._env_index[:, None], alive.shape)
+        flat[rows[alive], (self.enemy_y.astype(np.intp) * width + self.enemy_x)[alive]] = OBS_ENEMY
+
+        flat[self._env_index, self.player_y.astype(np.intp) * width + self.player_x] = OBS_PLAYER
+        return obs
+
+    # --- Stepping ---
+
+    def _step_movement(self, actions: npt.NDArray[np.int_], reward: npt.NDArray[np.float32]) -> npt.NDArray[np.bool_]:
+        """Vectorized Player.move plus the exit and collision checks. Returns envs that cleared a level."""
+        moving = (self.mode == MODE_PLAYING) & (actions <= ACTION_RIGHT)
+        new_y = self.player_y + ACTION_DY[actions] * moving
+        new_x = self.player_x + ACTION_DX[actions] * moving
+
+        in_bounds = (new_y >= 0) & (new_y < self.grid_size) & (new_x >= 0) & (new_x < self.grid_size)
+        safe_y = np.clip(new_y, 0, self.grid_size - 1)
+        safe_x = np.clip(new_x, 0, self.grid_size - 1)
+        target_tile = self.maps[self._env_index, safe_y, safe_x]
+
+        moved = moving & in_bounds & (target_tile != 0)
+        self.player_y = np.where(moved, new_y, self.player_y).astype(np.int16)
+        self.player_x = np.where(moved, new_x, self.player_x).astype(np.int16)
+
+        # Exit tile: transition only once every enemy is defeated, otherwise stay on the tile
+        on_exit = moved & (target_tile == 4)
+        enemies_left = (self.enemy_health > 0).any(axis=1)
+        cleared = on_exit & ~enemies_left
+        reward += cleared
+
+        # Collisions are only checked after a normal move (the exit returns early in update_game_state)
+        check = moved & ~on_exit
+        hits_enemy = (self.enemy_health > 0) & (self.enemy_y == self.player_y[:, None]) & (self.enemy_x == self.player_x[:, None]) & check[:, None]
+        encounter = hits_enemy.any(axis=1)
+        self.mode[encounter] = MODE_ENCOUNTER
+        self.current_enemy = np.where(encounter, hits_enemy.argmax(axis=1), self.current_enemy).astype(np.int8)
+
+        # Chest.open: weapons replace the current weapon, armour is added once
+        hits_chest = ~self.chest_opened & (self.chest_y == self.player_y[:, None]) & (self.chest_x == self.player_x[:, None]) & (check & ~encounter)[:, None]
+        if hits_chest.any():
+            env_ids, slots = np.nonzero(hits_chest)
+            items = self.chest_item[env_ids, slots]
+            is_weapon = ITEM_IS_WEAPON[items]
+            self.weapon[env_ids[is_weapon]] = items[is_weapon]
+            self.has_iron_armour[env_ids[items == IRON_ARMOUR_ID]] = True
+            self.chest_opened[env_ids, slots] = True
+
+        return cleared
+
+    def _step_encounter(self, actions: npt.NDArray[np.int_], at_prompt: npt.NDArray[np.bool_]) -> None:
+        """Vectorized (F)ight or (R)un prompt of enemy_encounter; other answers leave the prompt open."""
+        running = at_prompt & (actions == ACTION_RUN)
+        self.mode[running] = MODE_PLAYING
+        self.current_enemy[running] = -1
+        self.mode[at_prompt & (actions == ACTION_FIGHT)] = MODE_FIGHT
+
+    def _step_combat(self, actions: npt.NDArray[np.int_], reward: npt.NDArray[np.float32], in_fight: npt.NDArray[np.bool_]) -> None:
+        """Vectorized single fight turn (fight, enemy_turn and handle_turn_outcomes) for envs in a fight.
+
+        Actions other than Attack and Defend are invalid and lose the turn.
+        """
+        fighting = np.nonzero(in_fight)[0]
+        if fighting.size == 0:
+            return
+
+        act = actions[fighting]
+        slot = self.current_enemy[fighting].astype(np.intp)
+        attack = act == ACTION_ATTACK
+        defend = act == ACTION_DEFEND
+        count = fighting.size
+
+        # Player attack damage, crit on 1 in 10 and poison on 2 in 10 for status weapons
+        weapon = self.weapon[fighting]
+        crit = self.rng.integers(0, 10, count) == 0
+        damage = np.where(crit, ITEM_CRIT_DAMAGE[weapon], ITEM_BASE_DAMAGE[weapon]) * attack
+        poisons = attack & ITEM_POISONS[weapon] & (self.rng.integers(0, 10, count) < 2)
+        poison = self.enemy_poison[fighting, slot]
+        poison = np.where(poisons, 2, poison)
+
+        # Enemy action: 0 Attack, 1 Defend, 2 Heal, plus the outcome map rolls
+        enemy_action = self.rng.integers(0, 3, count)
+        defend_roll = self.rng.integers(0, 2, count)
+        block_roll = self.rng.integers(0, 3, count)
+
+        # Poison ticks before the turn outcomes are applied
+        poisoned = poison > 0
+        enemy_hp = self.enemy_health[fighting, slot] - poisoned
+        poison = poison - poisoned
+
+        e_attack = enemy_action == 0
+        e_defend = enemy_action == 1
+        e_heal = enemy_action == 2
+
+        player_hit = (e_attack & ~defend) | (e_attack & defend & (defend_roll == 1)) | (e_defend & attack & (block_roll == 2))
+        enemy_hit = (e_heal & attack) | (e_attack & attack) | (e_defend & attack & (block_roll == 1))
+        recoil = e_attack & defend & self.has_iron_armour[fighting]
+        enemy_hp = enemy_hp - damage * enemy_hit - recoil + (e_heal & defend)
+
+        self.player_health[fighting] -= player_hit.astype(np.int16)
+        self.enemy_health[fighting, slot] = enemy_hp
+        self.enemy_poison[fighting, slot] = poison
+
+        defeated = enemy_hp <= 0
+        self.enemy_health[fighting[defeated], slot[defeated]] = 0
+        reward[fighting[defeated]] += 1.0
+        ended = defeated | (self.player_health[fighting] <= 0)
+        self.mode[fighting[ended]] = MODE_PLAYING
+        self.current_enemy[fighting[ended]] = -1
+
+    def step(self, actions: npt.ArrayLike) -> Tuple[npt.NDArray[np.int8], npt.NDArray[np.float32], npt.NDArray[np.bool_], Dict[str, npt.NDArray]]:
+        """Advances every environment by one turn.
+
+        Returns (observations, rewards, dones, info). Rewards are +1 per enemy defeated,
+        +1 per level cleared and -1 on death. Finished games are reset automatically and
+        info['level'] reports the level reached before any reset.
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected {self.num_envs} actions, got shape {actions.shape}")
+
+        reward: npt.NDArray[np.float32] = np.zeros(self.num_envs, dtype=np.float32)
+        at_prompt = self.mode == MODE_ENCOUNTER
+        was_fighting = self.mode == MODE_FIGHT
+
+        # Envs that start the turn at an encounter prompt answer it, the rest move
+        cleared = self._step_movement(actions, reward)
+        self._step_encounter(actions, at_prompt)
+        self._step_combat(actions, reward, was_fighting)
+
+        done = self.player_health <= 0
+        reward -= done
+        info = {"level": self.level.copy()}
+
+        for i in np.nonzero(done)[0]:
+            self._reset_env(i)
+        for i in np.nonzero(cleared & ~done)[0]:
+            self._load_level(i)
+
+        return self.observe(), reward, done, info
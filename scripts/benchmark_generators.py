@@ -0,0 +1,28 @@
+import time
+import random as r
+from typing import List
+import numpy as np # type: ignore
+from levelgenerator import GENERATORS
+
+# Map sizes to compare and how many maps to generate per measurement
+BENCHMARK_SIZES: List[int] = [25, 100, 250, 500]
+BENCHMARK_REPEATS: int = 5
+
+def benchmark_generators(sizes: List[int] = BENCHMARK_SIZES, repeats: int = BENCHMARK_REPEATS) -> None:
+    """Prints the average generation time and floor coverage of every registered generator."""
+    r.seed(0)
+    print(f"{'generator':<12} {'size':>6} {'ms/level':>10} {'floor %':>8}")
+    print("-" * 39)
+    for size in sizes:
+        for name, generator in GENERATORS.items():
+            generator(size) # Warm-up run so first-call overhead is not measured
+            floor_fraction = 0.0
+            start = time.perf_counter()
+            for _ in range(repeats):
+                dungeon_map = generator(size)
+                floor_fraction += float(np.mean(dungeon_map != 0))
+            elapsed = (time.perf_counter() - start) / repeats
+            print(f"{name:<12} {size:>6} {elapsed * 1000:>10.2f} {100 * floor_fraction / repeats:>7.1f}%")
+
+if __name__ == "__main__":
+    benchmark_generators()
@@ -0,0 +1,216 @@
+import math
+import random as r
+import time
+from typing import List, Optional, Tuple
+from game_data import Enemy, Player, WEAPON_DAMAGE, WEAPON_STATUS_EFFECTS, MCTS_TIME_BUDGET, MCTS_MAX_DEPTH, MCTS_EXPLORATION
+
+# Enemy actions in the same order as enemy_turn's randint(0, 2) table
+ENEMY_ACTIONS: Tuple[str, str, str] = ('A', 'D', 'H')
+
+class CombatRules:
+    """Fight numbers that never change during a fight, shared by every clone of a CombatState."""
+    __slots__ = ['base_damage', 'crit_damage', 'poison_weapon', 'iron_armour']
+
+    def __init__(self, player: Player):
+        weapon = getattr(player, 'weapon', 'Fists')
+        self.base_damage, self.crit_damage = WEAPON_DAMAGE.get(weapon, (1, 1))
+        self.poison_weapon: bool = WEAPON_STATUS_EFFECTS.get(weapon, "None") == "Poisoned"
+        self.iron_armour: bool = "Iron Armour" in getattr(player, 'armour', [])
+
+class CombatState:
+    """Minimal mutable fight state: three ints plus a reference to the shared rules.
+
+    clone() copies only the ints, so search can branch thousands of times per
+    millisecond instead of deep-copying the Player and Enemy objects.
+    """
+    __slots__ = ['rules', 'player_health', 'enemy_health', 'enemy_poison']
+
+    def __init__(self, rules: CombatRules, player_health: int, enemy_health: int, enemy_poison: int):
+        self.rules = rules
+        self.player_health = player_health
+        self.enemy_health = enemy_health
+        self.enemy_poison = enemy_poison
+
+    @staticmethod
+    def from_entities(player: Player, enemy: Enemy) -> 'CombatState':
+        poison = enemy.status_duration if enemy.status == "Poisoned" else 0
+        return CombatState(CombatRules(player), player.health, enemy.health, poison)
+
+    def clone(self) -> 'CombatState':
+        return CombatState(self.rules, self.player_health, self.enemy_health, self.enemy_poison)
+
+    def is_over(self) -> bool:
+        return self.player_health <= 0 or self.enemy_health <= 0
+
+    def step(self, player_action: str, enemy_action: str, rnd) -> None:
+        """Plays one fight turn in place, following fight() and handle_turn_outcomes.
+
+        rnd is a random() function; every roll of the real fight is reproduced with it.
+        """
+        rules = self.rules
+        damage = 0
+        if player_action == 'A':
+            if rules.poison_weapon and rnd() < 0.2:
+                self.enemy_poison = 2
+            damage = rules.crit_damage if rnd() < 0.1 else rules.base_damage
+
+        # Poison ticks before the outcomes are applied
+        if self.enemy_poison > 0:
+            self.enemy_health -= 1
+            self.enemy_poison -= 1
+
+        if enemy_action == 'A':
+            if player_action == 'D':
+                if rnd() < 0.5: # PLAYER_DEFEND_FAIL
+                    self.player_health -= 1
+                if rules.iron_armour:
+                    self.enemy_health -= 1
+            elif player_action == 'A':
+                self.player_health -= 1
+                self.enemy_health -= damage
+            else:
+                self.player_health -= 1
+        elif enemy_action == 'D':
+            if player_action == 'A':
+                roll = rnd()
+                if roll < 1 / 3:
+                    pass # ENEMY_BLOCK_OK
+                elif roll < 2 / 3:
+                    self.enemy_health -= damage # ENEMY_BLOCK_BROKEN
+                else:
+                    self.player_health -= 1 # ENEMY_PARRY
+        else: # Heal
+            if player_action == 'D':
+                self.enemy_health += 1
+            elif player_action == 'A':
+                self.enemy_health -= damage
+
+    def score(self) -> float:
+        """Value of the state for the enemy, in [-1, 1]."""
+        if self.player_health <= 0:
+            return 1.0
+        if self.enemy_health <= 0:
+            return -1.0
+        # Unfinished fights: whoever has more health left is ahead
+        return max(-0.9, min(0.9, (self.enemy_health - self.player_health) / 10))
+
+class _Node:
+    """Open-loop search node: statistics for one sequence of enemy actions."""
+    __slots__ = ['children', 'visits', 'value']
+
+    def __init__(self):
+        self.children: List[Optional['_Node']] = [None, None, None]
+        self.visits: int = 0
+        self.value: float = 0.0
+
+class MCTSEnemyAI:
+    """Chooses enemy fight actions with Monte Carlo tree search under a per-turn time budget.
+
+    The player's choice and every dice roll are sampled inside the search (open-loop
+    MCTS), so the tree is only over the enemy's own actions. The player is modelled as
+    attacking with probability player_attack_rate.
+    """
+
+    def __init__(self, time_budget: float = MCTS_TIME_BUDGET, max_depth: int = MCTS_MAX_DEPTH,
+                 exploration: float = MCTS_EXPLORATION, player_attack_rate: float = 0.5, seed: Optional[int] = None):
+        self.time_budget: float = time_budget
+        self.max_depth: int = max_depth
+        self.exploration: float = exploration
+        self.player_attack_rate: float = player_attack_rate
+        self.rng: r.Random = r.Random(seed)
+        # Stats of the last search and running totals, for tuning the budget
+        self.last_rollouts: int = 0
+        self.last_elapsed: float = 0.0
+        self.total_rollouts: int = 0
+        self.total_elapsed: float = 0.0
+
+    @property
+    def rollouts_per_second(self) -> float:
+        """Average search throughput over every choice made so far."""
+        return self.total_rollouts / self.total_elapsed if self.total_elapsed > 0 else 0.0
+
+    def stats(self) -> str:
+        return (f"MCTS: {self.last_rollouts} rollouts in {self.last_elapsed * 1000:.1f} ms "
+                f"({self.rollouts_per_second:,.0f} rollouts/s average)")
+
+    def choose_action(self, player: Player, enemy: Enemy) -> str:
+        """Returns the enemy's action ('A', 'D' or 'H') for this turn."""
+        return self.search(CombatState.from_entities(player, enemy))
+
+    def search(self, root_state: CombatState) -> str:
+        """Runs rollouts until the time budget is spent and returns the most visited action."""
+        rnd = self.rng.random
+        attack_rate = self.player_attack_rate
+        max_depth = self.max_depth
+        c = self.exploration
+        log = math.log
+        sqrt = math.sqrt
+        root = _Node()
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        rollouts = 0
+        while True:
+            state = root_state.clone()
+            node = root
+            path = [root]
+            depth = 0
+
+            # Selection and expansion: walk the tree until a new node or the end of the fight
+            while depth < max_depth and not state.is_over():
+                children = node.children
+                best = -1
+                best_value = -math.inf
+                log_visits = log(node.visits + 1)
+                for i in range(3):
+                    child = children[i]
+                    if child is None or child.visits == 0:
+                        best = i
+                        break
+                    ucb = child.value / child.visits + c * sqrt(log_visits / child.visits)
+                    if ucb > best_value:
+                        best, best_value = i, ucb
+                child = children[best]
+                if child is None:
+                    child = children[best] = _Node()
+                state.step('A' if rnd() < attack_rate else 'D', ENEMY_ACTIONS[best], rnd)
+                depth += 1
+                path.append(child)
+                node = child
+                if child.visits == 0:
+                    break
+
+            # Rollout: random enemy play until the fight ends or the depth limit
+            while depth < max_depth and not state.is_over():
+                state.step('A' if rnd() < attack_rate else 'D', ENEMY_ACTIONS[int(rnd() * 3)], rnd)
+                depth += 1
+
+            value = state.score()
+            for visited in path:
+                visited.visits += 1
+                visited.value += value
+
+            rollouts += 1
+            # Check the clock every few rollouts, it costs as much as a rollout step
+            if rollouts & 15 == 0 and time.perf_counter() >= deadline:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.last_rollouts = rollouts
+        self.last_elapsed = elapsed
+        self.total_rollouts += rollouts
+        self.total_elapsed += elapsed
+
+        visits = [child.visits if child is not None else -1 for child in root.children]
+        return ENEMY_ACTIONS[visits.index(max(visits))]
+
+if __name__ == "__main__":
+    # Throughput report for tuning MCTS_TIME_BUDGET
+    player = Player(0, 0)
+    player.weapon = "Poison Bow"
+    enemy = Enemy(0, 0, health=3)
+    for budget_ms in (1, 2, 5, 10, 20):
+        ai = MCTSEnemyAI(time_budget=budget_ms / 1000, seed=0)
+        choices = [ai.choose_action(player, enemy) for _ in range(50)]
+        print(f"budget {budget_ms:>3} ms: {ai.total_rollouts / 50:>8.0f} rollouts/turn, {ai.rollouts_per_second:>10,.0f} rollouts/s, "
+              f"choices A/D/H = {choices.count('A')}/{choices.count('D')}/{choices.count('H')}")
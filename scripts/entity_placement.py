@@ -0,0 +1,109 @@
+import math
+import random as r
+from typing import List, Tuple
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+from game_data import ENEMY_DENSITY, ENEMY_DENSITY_PER_LEVEL, MAX_ENEMY_DENSITY, CHEST_DENSITY, ENTITY_MIN_SPACING, ENTITY_MIN_ENTRANCE_DISTANCE, ENTITY_MIN_EXIT_DISTANCE
+
+class OccupancyGrid:
+    """Tile-resolution maps of placed points and of the tiles too close to them.
+
+    Inserting a point stamps a disk of radius min_spacing into `crowded`, so checking a
+    whole array of candidates for spacing is a single fancy-indexing lookup.
+    """
+    __slots__ = ['occupied', 'crowded', '_flat', '_stride', '_stencil']
+
+    def __init__(self, shape: Tuple[int, int], min_spacing: float):
+        height, width = shape
+        radius = max(0, math.ceil(min_spacing) - 1)
+        offsets = np.arange(-radius, radius + 1)
+        dy, dx = np.nonzero(offsets[:, None] ** 2 + offsets[None, :] ** 2 < max(1.0, min_spacing) ** 2)
+        self.occupied: npt.NDArray[np.bool_] = np.zeros(shape, dtype=bool)
+        # Padded by the radius so a stamp never needs clipping; `crowded` is the unpadded view
+        padded = np.zeros((height + 2 * radius, width + 2 * radius), dtype=bool)
+        self._flat: npt.NDArray[np.bool_] = padded.ravel() # A view, stamps write through to `crowded`
+        self._stride = width + 2 * radius
+        self._stencil: npt.NDArray[np.intp] = (dy * self._stride + dx).astype(np.intp) # Flat offsets from the disk's corner
+        self.crowded: npt.NDArray[np.bool_] = padded[radius:radius + height, radius:radius + width] # Closer than min_spacing to a placed point
+
+    def insert(self, y: int, x: int) -> None:
+        """Marks a placed point and every tile within min_spacing of it."""
+        self.occupied[y, x] = True
+        self._flat[y * self._stride + x + self._stencil] = True
+
+def density_for_level(level: int) -> Tuple[float, float]:
+    """Returns the (enemy, chest) density targets per floor tile for a level."""
+    enemy_density = min(ENEMY_DENSITY + ENEMY_DENSITY_PER_LEVEL * max(0, level - 1), MAX_ENEMY_DENSITY)
+    return enemy_density, CHEST_DENSITY
+
+def _far_from(shape: Tuple[int, int], points: npt.NDArray[np.int_], min_distance: float) -> npt.NDArray[np.bool_]:
+    """Returns a map that is True on tiles at least min_distance from every point."""
+    far = np.ones(shape, dtype=bool)
+    if min_distance <= 0:
+        return far
+    radius = math.ceil(min_distance)
+    for py, px in points.tolist():
+        # Only the window around each point can be too close
+        top, left = max(0, py - radius), max(0, px - radius)
+        yy, xx = np.ogrid[top:min(shape[0], py + radius + 1), left:min(shape[1], px + radius + 1)]
+        far[top:top + yy.shape[0], left:left + xx.shape[1]] &= (yy - py) ** 2 + (xx - px) ** 2 >= min_distance ** 2
+    return far
+
+def poisson_disk_sample(candidates: npt.NDArray[np.int_], count: int, grid: OccupancyGrid, spaced: bool = True) -> List[Tuple[int, int]]:
+    """Picks up to count candidate tiles that keep the grid's spacing from each other and from points already in grid.
+
+    With spaced=False only tiles already taken are avoided. Candidates are tried in their
+    given (pre-shuffled) order a chunk at a time: blocked tiles are dropped from the chunk
+    with one array lookup, so the Python loop only sees tiles that were free when the
+    chunk started, and the scan stops as soon as enough tiles are accepted.
+    """
+    chosen: List[Tuple[int, int]] = []
+    if count <= 0:
+        return chosen
+    blocked = grid.crowded if spaced else grid.occupied
+    start = 0
+    while start < len(candidates) and len(chosen) < count:
+        chunk_size = max(64, 2 * (count - len(chosen)))
+        chunk = candidates[start:start + chunk_size]
+        start += chunk_size
+        chunk = chunk[~blocked[chunk[:, 0], chunk[:, 1]]]
+        for y, x in chunk.tolist():
+            if blocked[y, x]: # Taken by a tile accepted earlier in this chunk
+                continue
+            grid.insert(y, x)
+            chosen.append((y, x))
+            if len(chosen) == count:
+                break
+    return chosen
+
+def place_entities(dungeon_map: npt.NDArray[np.int_], num_enemies: int, num_chests: int, min_spacing: float = ENTITY_MIN_SPACING,
+                   min_entrance_distance: float = ENTITY_MIN_ENTRANCE_DISTANCE, min_exit_distance: float = ENTITY_MIN_EXIT_DISTANCE) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Returns (enemy_tiles, chest_tiles) as (y, x) floor tiles scattered with Poisson-disk spacing.
+
+    If the map is too small to fit every entity with the requested spacing, the remaining
+    ones are placed on any free floor tile instead.
+    """
+    floor_flat = np.flatnonzero(dungeon_map == 1)
+    if floor_flat.size == 0:
+        return [], []
+
+    # One shuffle with NumPy, seeded from the random module so r.seed() still reproduces levels
+    rng = np.random.default_rng(r.getrandbits(32))
+    floor_tiles = np.column_stack(np.divmod(rng.permutation(floor_flat), dungeon_map.shape[1]))
+
+    far = (_far_from(dungeon_map.shape, np.argwhere(dungeon_map == 2), min_entrance_distance)
+           & _far_from(dungeon_map.shape, np.argwhere(dungeon_map == 4), min_exit_distance))
+    spaced_tiles = floor_tiles[far[floor_tiles[:, 0], floor_tiles[:, 1]]]
+
+    # Enemies and chests share the grid so they keep their distance from each other too
+    grid = OccupancyGrid(dungeon_map.shape, min_spacing)
+    enemy_tiles = poisson_disk_sample(spaced_tiles, num_enemies, grid)
+    chest_tiles = poisson_disk_sample(spaced_tiles, num_chests, grid)
+
+    # Relaxed pass: any unused floor tile
+    if len(enemy_tiles) < num_enemies:
+        enemy_tiles += poisson_disk_sample(floor_tiles, num_enemies - len(enemy_tiles), grid, spaced=False)
+    if len(chest_tiles) < num_chests:
+        chest_tiles += poisson_disk_sample(floor_tiles, num_chests - len(chest_tiles), grid, spaced=False)
+
+    return enemy_tiles, chest_tiles
@@ -0,0 +1,219 @@
+import json
+import os
+import struct
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+from game_data import OutcomeCodes, WEAPON_LIST, ARMOUR_LIST, EVENT_LOG_CAPACITY, EVENT_LOG_FLUSH_INTERVAL
+
+# --- Event Schema ---
+# One fixed-size record per event. x/y/a/b mean different things per kind:
+#   MOVE:   x, y = new player position
+#   COMBAT: x = player action id, y = enemy action id, a = enemy damage taken, b = player damage taken
+#   STATUS: code = status id, b = player damage taken
+#   CHEST:  code = item id, x, y = chest position
+#   LEVEL:  a = level entered (the record's level is the one left)
+EVENT_DTYPE: np.dtype = np.dtype([
+    ('session', '<u4'), ('turn', '<u4'), ('level', '<u2'), ('kind', 'u1'), ('code', 'u1'),
+    ('x', '<i2'), ('y', '<i2'), ('a', '<i2'), ('b', '<i2'),
+])
+
+EVENT_MOVE: int = 1
+EVENT_COMBAT: int = 2
+EVENT_STATUS: int = 3
+EVENT_CHEST: int = 4
+EVENT_LEVEL: int = 5
+
+# Small integer ids for the strings stored in events
+OUTCOME_IDS: Dict[str, int] = {"None": 0, OutcomeCodes.PLAYER_DEFEND_SUCCESS: 1, OutcomeCodes.PLAYER_DEFEND_FAIL: 2,
+                               OutcomeCodes.ENEMY_BLOCK_OK: 3, OutcomeCodes.ENEMY_BLOCK_BROKEN: 4,
+                               OutcomeCodes.ENEMY_PARRY: 5, OutcomeCodes.STALEMATE: 6}
+ACTION_IDS: Dict[str, int] = {'': 0, 'A': 1, 'D': 2, 'H': 3}
+STATUS_IDS: Dict[str, int] = {"None": 0, "Poisoned": 1}
+ITEM_IDS: Dict[str, int] = {name: i + 1 for i, name in enumerate(WEAPON_LIST + ARMOUR_LIST)}
+
+# File layout: magic, length-prefixed JSON schema, then batches of
+# (b'EVTB', uint32 count) followed by each column's raw bytes in schema order.
+FILE_MAGIC: bytes = b"RPGEVT01"
+BATCH_MAGIC: bytes = b"EVTB"
+
+class EventLog:
+    """Records gameplay events into a ring buffer that a background thread flushes to disk.
+
+    record() only stores a tuple in a preallocated list slot. The game thread is the
+    only writer of the tail index and the flusher the only writer of the head index, so
+    recording takes no lock. When the buffer is full new events are counted in `dropped`
+    instead of blocking the game. The flusher converts each batch to NumPy columns and
+    appends it to the log file in one write.
+    """
+
+    def __init__(self, path: str, capacity: int = EVENT_LOG_CAPACITY, flush_interval: float = EVENT_LOG_FLUSH_INTERVAL):
+        self.path: str = path
+        self.capacity: int = capacity
+        self.flush_interval: float = flush_interval
+        self.dropped: int = 0
+        self.written: int = 0
+        # Context stamped on every event; the game loop keeps it current
+        self.session: int = 0
+        self.level: int = 0
+        self.turn: int = 0
+
+        self._ring: List[Optional[Tuple[int, ...]]] = [None] * capacity
+        self._head: int = 0 # Next event to flush
+        self._tail: int = 0 # Next free slot
+        self._flush_lock = threading.Lock() # Serializes flush() between the flusher and close()
+        self._wake = threading.Event()
+        self._stopping = False
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if is_new:
+            schema = json.dumps(EVENT_DTYPE.descr).encode()
+            self._file.write(FILE_MAGIC + struct.pack('<I', len(schema)) + schema)
+            self._file.flush()
+
+        self._thread = threading.Thread(target=self._flush_loop, name="event-log-flusher", daemon=True)
+        self._thread.start()
+
+    def record(self, kind: int, code: int = 0, x: int = 0, y: int = 0, a: int = 0, b: int = 0) -> None:
+        """Queues one event stamped with the current session, turn and level (game thread only)."""
+        tail = self._tail
+        pending = tail - self._head
+        if pending >= self.capacity:
+            self.dropped += 1
+            return
+        self._ring[tail % self.capacity] = (self.session, self.turn, self.level, kind, code, x, y, a, b)
+        self._tail = tail + 1 # Publish the slot only after it is written
+        if pending == self.capacity // 2:
+            self._wake.set() # Half full, flush early
+
+    def flush(self) -> None:
+        """Writes every queued event to the file."""
+        with self._flush_lock:
+            head, tail = self._head, self._tail
+            if head == tail:
+                return
+            start, end = head % self.capacity, tail % self.capacity
+            if start < end:
+                batch = self._ring[start:end]
+            else:
+                batch = self._ring[start:] + self._ring[:end]
+            self._head = tail # Slots are free for the game thread again
+
+            # Transpose to columns, each converted to its on-disk type in one call
+            count = len(batch)
+            chunks = [BATCH_MAGIC, struct.pack('<I', count)]
+            for name, column in zip(EVENT_DTYPE.names, zip(*batch)):
+                chunks.append(np.fromiter(column, dtype=EVENT_DTYPE[name], count=count).tobytes())
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            self.written += count
+
+    def close(self) -> None:
+        """Stops the flusher, writes the remaining events and closes the file."""
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+    def _flush_loop(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+# --- Active log used by the game ---
+
+_active_log: Optional[EventLog] = None
+
+def open_event_log(path: str) -> EventLog:
+    """Starts recording game events to path."""
+    global _active_log
+    if _active_log is not None:
+        _active_log.close()
+    _active_log = EventLog(path)
+    return _active_log
+
+def close_event_log() -> None:
+    global _active_log
+    if _active_log is not None:
+        _active_log.close()
+        _active_log = None
+
+def set_event_context(session: int, level: int, turn: int) -> None:
+    """Sets the session, level and turn stamped on the following events."""
+    log = _active_log
+    if log is not None:
+        log.session, log.level, log.turn = session, level, turn
+
+def record_event(kind: int, code: int = 0, x: int = 0, y: int = 0, a: int = 0, b: int = 0) -> None:
+    """Records an event if a log is open; a no-op otherwise."""
+    log = _active_log
+    if log is not None:
+        log.record(kind, code, x, y, a, b)
+
+# --- Reader and queries ---
+
+def load_events(path: str) -> npt.NDArray:
+    """Loads a log file into one structured array (use events['level'], events['kind'], ...)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(FILE_MAGIC):
+        raise ValueError(f"{path} is not an event log")
+    offset = len(FILE_MAGIC)
+    (schema_len,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    dtype = np.dtype([tuple(field) for field in json.loads(data[offset:offset + schema_len])])
+    offset += schema_len
+
+    batches: List[npt.NDArray] = []
+    while offset + 8 <= len(data):
+        if data[offset:offset + 4] != BATCH_MAGIC:
+            raise ValueError(f"Corrupt batch header at byte {offset}")
+        (count,) = struct.unpack_from('<I', data, offset + 4)
+        offset += 8
+        batch = np.empty(count, dtype=dtype)
+        for name in dtype.names:
+            size = count * dtype[name].itemsize
+            batch[name] = np.frombuffer(data, dtype=dtype[name], count=count, offset=offset)
+            offset += size
+        batches.append(batch)
+    return np.concatenate(batches) if batches else np.empty(0, dtype=dtype)
+
+def damage_taken_per_level(events: npt.NDArray) -> Dict[int, int]:
+    """Total player damage from fights and status effects, keyed by level."""
+    hurt = events[(events['kind'] == EVENT_COMBAT) | (events['kind'] == EVENT_STATUS)]
+    totals = np.bincount(hurt['level'], weights=hurt['b'].clip(min=0))
+    return {level: int(total) for level, total in enumerate(totals) if total}
+
+def parry_rate(events: npt.NDArray) -> float:
+    """Share of player attacks into an enemy defence that were parried."""
+    combat = events[events['kind'] == EVENT_COMBAT]
+    attacks_on_defence = combat[(combat['x'] == ACTION_IDS['A']) & (combat['y'] == ACTION_IDS['D'])]
+    if attacks_on_defence.size == 0:
+        return 0.0
+    return float(np.mean(attacks_on_defence['code'] == OUTCOME_IDS[OutcomeCodes.ENEMY_PARRY]))
+
+def summarize(events: npt.NDArray) -> Dict[str, Any]:
+    """A few aggregate numbers for a quick look at a log."""
+    kinds = np.bincount(events['kind'], minlength=EVENT_LEVEL + 1)
+    return {
+        "events": int(events.size),
+        "sessions": int(np.unique(events['session']).size),
+        "moves": int(kinds[EVENT_MOVE]),
+        "combat_turns": int(kinds[EVENT_COMBAT]),
+        "chests_opened": int(kinds[EVENT_CHEST]),
+        "level_changes": int(kinds[EVENT_LEVEL]),
+        "parry_rate": round(parry_rate(events), 3),
+        "damage_taken_per_level": damage_taken_per_level(events),
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python event_log.py LOG_FILE")
+    else:
+        for key, value in summarize(load_events(sys.argv[1])).items():
+            print(f"{key}: {value}")
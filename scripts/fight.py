@@ -1,12 +1,16 @@
-from typing import Tuple, Optional
+from typing import Callable, Tuple, Optional
 from random import randint
 from game_data import Enemy, Player, WEAPON_DAMAGE, WEAPON_STATUS_EFFECTS, PLAYER_DEFENCE_OUTCOMES_MAP, ENEMY_DEFENCE_OUTCOMES_MAP, clear_terminal, OutcomeCodes
+from combat_ai import MCTSEnemyAI
+from event_log import record_event, EVENT_COMBAT, OUTCOME_IDS, ACTION_IDS
 
-def enemy_turn(player_action: str) -> tuple[str, str, str]:
-    """Determine and process the enemy's action. Returns (enemy_action, outcome_code, message)."""
+def enemy_turn(player_action: str, enemy_action: Optional[str] = None) -> tuple[str, str, str]:
+    """Determine and process the enemy's action. Returns (enemy_action, outcome_code, message).
+       The action is random unless one was already chosen (e.g. by an enemy AI)."""
 
-    enemy_actions = {0: 'A', 1: 'D', 2: 'H'}
-    enemy_action = enemy_actions[randint(0, 2)]
+    if enemy_action is None:
+        enemy_actions = {0: 'A', 1: 'D', 2: 'H'}
+        enemy_action = enemy_actions[randint(0, 2)]
 
     # Enemy Attacks
     if enemy_action == 'A':
@@ -81,8 +85,9 @@ def handle_turn_outcomes(enemy_action: str, action: str, player: Player, enemy:
             elif outcome_code == OutcomeCodes.ENEMY_PARRY:
                 player.health -= 1 # Player takes parry damage
 
-def fight(player: Player, enemy: Enemy) -> bool:
-    """Actual fight sequence. Returns whether enemy is defeated."""
+def fight(player: Player, enemy: Enemy, enemy_ai: Optional[MCTSEnemyAI] = None, on_turn: Optional[Callable[[], None]] = None) -> bool:
+    """Actual fight sequence. Returns whether enemy is defeated.
+       on_turn, if given, is called after every fight turn's outcomes are applied."""
 
     damage: int = 0
     is_critical_hit: bool = False
@@ -92,11 +97,15 @@ def fight(player: Player, enemy: Enemy) -> bool:
         print(f"\nYour Health: {player.health} | Enemy Health: {enemy.health}")
         print(f"Enemy Status: {enemy.status} (Duration: {enemy.status_duration})")
 
+        # A smart enemy commits to its action before seeing the player's choice
+        planned_action: Optional[str] = enemy_ai.choose_action(player, enemy) if enemy_ai else None
+
         # Player's Turn
         action: str = input("Do you want to (A)ttack or (D)efend? ").strip().upper()
         print("\n")
         
         # Reset turn variables
+        player_health_before, enemy_health_before = player.health, enemy.health
         damage = 0
         is_critical_hit = False
         
@@ -131,7 +140,7 @@ def fight(player: Player, enemy: Enemy) -> bool:
         enemy_action: str
         outcome_code: str
         result_message: str
-        enemy_action, outcome_code, result_message = enemy_turn(action)
+        enemy_action, outcome_code, result_message = enemy_turn(action, planned_action)
         print(result_message)
 
         # Print secondary messages
@@ -150,6 +159,10 @@ def fight(player: Player, enemy: Enemy) -> bool:
 
         # Turn Outcomes - uses the robust outcome_code
         handle_turn_outcomes(enemy_action, action, player, enemy, damage, outcome_code)
+        record_event(EVENT_COMBAT, OUTCOME_IDS.get(outcome_code, 0), ACTION_IDS.get(action, 0), ACTION_IDS[enemy_action],
+                     enemy_health_before - enemy.health, player_health_before - player.health)
+        if on_turn:
+            on_turn()
 
         if enemy.health <= 0:
             print("Enemy defeated!")
@@ -160,7 +173,8 @@ def fight(player: Player, enemy: Enemy) -> bool:
 
     return enemy.health <= 0
 
-def enemy_encounter(game_state: str, enemy: Enemy, player: Player) -> Tuple[str, int]:
+def enemy_encounter(game_state: str, enemy: Enemy, player: Player, enemy_ai: Optional[MCTSEnemyAI] = None,
+                    on_turn: Optional[Callable[[], None]] = None) -> Tuple[str, int]:
     """Handle the enemy encounter state. Returns updated game state and player health."""
 
     print("You encountered an enemy!")
@@ -171,7 +185,7 @@ def enemy_encounter(game_state: str, enemy: Enemy, player: Player) -> Tuple[str,
 
         if action == 'F':
             print("You chose to fight!")
-            enemy_defeated = fight(player, enemy)
+            enemy_defeated = fight(player, enemy, enemy_ai, on_turn)
 
             if player.health <= 0:
                 game_state = "game_over"
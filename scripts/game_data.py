@@ -4,12 +4,64 @@ import numpy.typing as npt# type: ignore
 import os
 import platform
 import pickle # New import for saving/loading
+from level_cache import LevelCache
 
 # --- Global Variables for Level Generation ---
 GRID_SIZE: int = 25
 WALK_STEPS: int = 450
 level_size: int = GRID_SIZE
 
+# Cellular-automata cave settings: initial wall chance and smoothing passes
+CAVE_FILL_PROBABILITY: float = 0.45
+CAVE_SMOOTHING_PASSES: int = 4
+# BSP dungeon settings: smallest partition a room can be carved into
+BSP_MIN_LEAF_SIZE: int = 8
+# Entity placement: density targets (entities per floor tile) and spacing in tiles
+ENEMY_DENSITY: float = 0.012
+ENEMY_DENSITY_PER_LEVEL: float = 0.002
+MAX_ENEMY_DENSITY: float = 0.04
+CHEST_DENSITY: float = 0.005
+ENTITY_MIN_SPACING: float = 3.0
+ENTITY_MIN_ENTRANCE_DISTANCE: float = 4.0
+ENTITY_MIN_EXIT_DISTANCE: float = 2.0
+# Map generator used per level, cycled in order (names from levelgenerator.GENERATORS)
+LEVEL_GENERATOR_SCHEDULE: List[str] = ["random_walk", "cave", "bsp"]
+
+# --- Enemy AI Settings ---
+# Seconds of Monte Carlo tree search per enemy turn when smart enemies are enabled
+MCTS_TIME_BUDGET: float = 0.005
+# Fight turns simulated per rollout before the position is scored
+MCTS_MAX_DEPTH: int = 12
+# UCB1 exploration constant
+MCTS_EXPLORATION: float = 1.4
+
+# --- Spectator Settings ---
+# Frames a viewer may have queued before its deltas are dropped and it is resynced
+SPECTATOR_MAX_PENDING_FRAMES: int = 64
+# Resyncs in a row without catching up before a viewer is disconnected
+SPECTATOR_MAX_RESYNCS: int = 3
+
+# --- Event Log Settings ---
+# Events held in memory between flushes (new events are dropped when it is full)
+EVENT_LOG_CAPACITY: int = 65536
+# Seconds between background flushes to the log file
+EVENT_LOG_FLUSH_INTERVAL: float = 1.0
+
+# --- Server Settings ---
+SERVER_PORT: int = 7777
+# Pre-generated maps placed in shared memory for all worker processes
+SERVER_MAP_POOL_SIZE: int = 1024
+# Interactive turns a worker keeps paused at a prompt; each holds a parked thread until answered
+SERVER_MAX_PAUSED_TURNS: int = 256
+# Stack size for the worker threads that run turns (game code never recurses deeply)
+SERVER_TURN_STACK_BYTES: int = 1024 * 1024
+
+# --- Level Cache Settings ---
+# Levels within this distance of the current level stay uncompressed in memory
+LEVEL_CACHE_HOT_RADIUS: int = 1
+# Memory cap for compressed older levels before they are paged out to disk
+LEVEL_CACHE_MAX_BYTES: int = 256 * 1024
+
 # Symbols for map rendering (0:Wall, 1:Floor, 2:Entrance, 3:Chest, 4:Exit)
 MAP_SYMBOLS: Dict[int, str] = {0: '█', 1: ' ', 2: ' ', 3: 'C', 4: '>'} # ADDED '4' FOR EXIT
 
@@ -59,8 +111,13 @@ ENEMY_DEFENCE_OUTCOMES_MAP: Dict[int, Tuple[str, str]] = {
 }
 
 
+# Set when the game is driven by bots or tools rather than a terminal
+HEADLESS: bool = False
+
 def clear_terminal() -> None:
     """Clears the terminal screen."""
+    if HEADLESS:
+        return
     if platform.system() == "Windows":
         os.system('cls')
     else:
@@ -119,6 +176,10 @@ class Player:
             # Check for the exit tile (value 4)
             if target_tile == 4:
                 return "ExitTile" # Custom return for the exit tile
+
+            # Check for the entrance tile (value 2), the stairs back up
+            if target_tile == 2:
+                return "EntranceTile"
             
             return "Moved"
 
@@ -196,6 +257,10 @@ class GameState:
         self.level: int = 0
         self.game_state: str = "next_level_transition" # Start at transition to generate Lvl 1
         self.current_enemy: Optional[Enemy] = None # Enemy in current fight
+        # Visited levels, kept so the player can go back up the stairs
+        self.level_cache: LevelCache = LevelCache(LEVEL_CACHE_HOT_RADIUS, LEVEL_CACHE_MAX_BYTES)
+        # Off for sessions hosted by the server, where every session would share one save file
+        self.saving_allowed: bool = True
 
     def save_to_file(self, filename: str = 'savegame.dat') -> None:
         """Saves the entire GameState object using pickle."""
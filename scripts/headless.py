@@ -0,0 +1,86 @@
+import builtins
+import contextlib
+import os
+import random as r
+from collections import deque
+from typing import Deque, Iterable, Iterator, Optional, TextIO
+import game_data
+from game_data import GameState, Player
+from main import STATE_HANDLERS, apply_status_effects, update_game_state
+
+class AutoResponder:
+    """Stands in for input() when the game runs without a player.
+
+    Scripted answers are used first; once they run out every prompt gets a valid answer
+    chosen by a simple random policy, so no prompt loop can wait forever.
+    """
+
+    def __init__(self, answers: Iterable[str] = (), rng: Optional[r.Random] = None):
+        self.answers: Deque[str] = deque(answers)
+        self.rng: r.Random = rng or r.Random()
+
+    def feed(self, *answers: str) -> None:
+        """Queues answers for the next prompts."""
+        self.answers.extend(answers)
+
+    def __call__(self, prompt: str = "") -> str:
+        if self.answers:
+            return self.answers.popleft()
+        if "(F)ight or (R)un" in prompt:
+            return 'F' if self.rng.random() < 0.8 else 'R'
+        if "(A)ttack or (D)efend" in prompt:
+            return self.rng.choice('AD')
+        if "Replace it?" in prompt:
+            return self.rng.choice('YN')
+        if "Go up?" in prompt:
+            return 'Y' if self.rng.random() < 0.2 else 'N'
+        if "Choose 1-" in prompt:
+            # "Choose 1-N ..." -> any option, including cancel
+            return str(self.rng.randint(1, int(prompt.split('-')[1].split()[0])))
+        if "Enter your name" in prompt:
+            return "Bot"
+        if "(Y/N)" in prompt:
+            return 'N' # Never save, quit or restart on a bot's behalf
+        return "" # "Press Enter to continue..."
+
+@contextlib.contextmanager
+def headless_session(responder: AutoResponder, output: Optional[TextIO] = None) -> Iterator[AutoResponder]:
+    """Runs the game without a terminal: prompts go to responder, output is discarded (or captured)."""
+    previous_input = builtins.input
+    previous_headless = game_data.HEADLESS
+    builtins.input = responder
+    game_data.HEADLESS = True
+    try:
+        if output is None:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                yield responder
+        else:
+            with contextlib.redirect_stdout(output):
+                yield responder
+    finally:
+        builtins.input = previous_input
+        game_data.HEADLESS = previous_headless
+
+def new_session(name: str = "Bot") -> GameState:
+    """Creates a fresh GameState and plays it up to the first 'playing' turn."""
+    state = GameState(name, Player(0, 0))
+    advance(state)
+    return state
+
+def advance(state: GameState) -> None:
+    """Runs the non-interactive states (transitions, encounters) until the player is asked for a command."""
+    while state.game_state not in ("playing", "game_over"):
+        handler = STATE_HANDLERS.get(state.game_state)
+        if handler is None:
+            state.game_state = "game_over"
+            return
+        handler(state)
+
+def run_turn(state: GameState, action: str) -> None:
+    """Plays one turn with the given command, the same way handle_playing does, then advances."""
+    if state.game_state == "playing":
+        apply_status_effects(state)
+        if state.game_state == "game_over":
+            return
+        update_game_state(state, action.strip().upper())
+    advance(state)
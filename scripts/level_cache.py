@@ -0,0 +1,165 @@
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+
+class LevelRecord:
+    """A visited level: its map plus the entities left on it."""
+    __slots__ = ['dungeon_map', 'enemies', 'chests']
+
+    def __init__(self, dungeon_map: npt.NDArray[np.int_], enemies: List[Any], chests: List[Any]):
+        # Map values are 0-4, so uint8 is enough and 8x smaller than the default int
+        self.dungeon_map = np.asarray(dungeon_map, dtype=np.uint8)
+        self.enemies = enemies
+        self.chests = chests
+
+    def compress(self) -> bytes:
+        """Packs the record into a zlib-compressed pickle."""
+        payload = (self.dungeon_map.shape, self.dungeon_map.tobytes(), self.enemies, self.chests)
+        return zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def decompress(data: bytes) -> 'LevelRecord':
+        """Rebuilds a record from compress() output."""
+        shape, map_bytes, enemies, chests = pickle.loads(zlib.decompress(data))
+        dungeon_map = np.frombuffer(map_bytes, dtype=np.uint8).reshape(shape).copy()
+        return LevelRecord(dungeon_map, enemies, chests)
+
+class LevelCache:
+    """Keeps visited levels so the player can return to them.
+
+    Levels within hot_radius of the current level stay uncompressed in memory. Older
+    levels are compressed and kept in an LRU; once the compressed levels exceed
+    max_memory_bytes the least recently used ones are paged out to a temporary directory.
+    """
+
+    def __init__(self, hot_radius: int = 1, max_memory_bytes: int = 256 * 1024):
+        self.hot_radius: int = hot_radius
+        self.max_memory_bytes: int = max_memory_bytes
+        self.current_level: int = 0
+        self._hot: Dict[int, LevelRecord] = {}
+        self._compressed: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._compressed_bytes: int = 0
+        self._on_disk: Dict[int, str] = {}
+        self._cache_dir: Optional[str] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def __contains__(self, level: int) -> bool:
+        return level in self._hot or level in self._compressed or level in self._on_disk
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._compressed) + len(self._on_disk)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate bytes held in memory by hot and compressed levels."""
+        return self._compressed_bytes + sum(rec.dungeon_map.nbytes for rec in self._hot.values())
+
+    @property
+    def paged_levels(self) -> int:
+        """Number of levels currently paged out to disk."""
+        return len(self._on_disk)
+
+    def store(self, level: int, dungeon_map: npt.NDArray[np.int_], enemies: List[Any], chests: List[Any]) -> None:
+        """Stores (or replaces) a level, then re-applies the hot set and memory cap."""
+        self._discard(level)
+        self._hot[level] = LevelRecord(dungeon_map, enemies, chests)
+        self._rebalance()
+
+    def fetch(self, level: int) -> Optional[LevelRecord]:
+        """Returns a stored level, paging it back in if needed, or None if it was never stored."""
+        record = self._hot.get(level)
+        if record is not None:
+            return record
+
+        data = self._compressed.pop(level, None)
+        if data is not None:
+            self._compressed_bytes -= len(data)
+        else:
+            path = self._on_disk.pop(level, None)
+            if path is None:
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.remove(path)
+
+        record = LevelRecord.decompress(data)
+        self._hot[level] = record
+        return record
+
+    def set_current(self, level: int) -> None:
+        """Marks the level the player is on and demotes levels that left the hot set."""
+        self.current_level = level
+        self._rebalance()
+
+    def close(self) -> None:
+        """Removes any paged-out level files."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = None
+        self._cache_dir = None
+        self._on_disk.clear()
+
+    # --- Internal helpers ---
+
+    def _discard(self, level: int) -> None:
+        """Drops every stored copy of a level."""
+        self._hot.pop(level, None)
+        data = self._compressed.pop(level, None)
+        if data is not None:
+            self._compressed_bytes -= len(data)
+        path = self._on_disk.pop(level, None)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _rebalance(self) -> None:
+        """Compresses levels outside the hot radius and pages out the LRU ones over the cap."""
+        for level in [lv for lv in self._hot if abs(lv - self.current_level) > self.hot_radius]:
+            data = self._hot.pop(level).compress()
+            self._compressed[level] = data
+            self._compressed_bytes += len(data)
+
+        while self._compressed_bytes > self.max_memory_bytes and self._compressed:
+            level, data = self._compressed.popitem(last=False) # Least recently used first
+            self._compressed_bytes -= len(data)
+            path = os.path.join(self._get_cache_dir(), f"level_{level}.bin")
+            with open(path, 'wb') as f:
+                f.write(data)
+            self._on_disk[level] = path
+
+    def _get_cache_dir(self) -> str:
+        """Creates the page-out directory on first use; it is removed with the cache."""
+        if self._cache_dir is None:
+            self._cache_dir = tempfile.mkdtemp(prefix="rpg_levels_")
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._cache_dir, True)
+        return self._cache_dir
+
+    # --- Pickling (save files must not point at temporary files) ---
+
+    def __getstate__(self) -> Dict[str, Any]:
+        compressed = OrderedDict()
+        for level, path in self._on_disk.items():
+            with open(path, 'rb') as f:
+                compressed[level] = f.read()
+        compressed.update(self._compressed)
+        return {
+            'hot_radius': self.hot_radius,
+            'max_memory_bytes': self.max_memory_bytes,
+            'current_level': self.current_level,
+            'hot': self._hot,
+            'compressed': compressed,
+        }
+
+    def __setstate__(self, data: Dict[str, Any]) -> None:
+        self.__init__(data['hot_radius'], data['max_memory_bytes'])
+        self.current_level = data['current_level']
+        self._hot = data['hot']
+        self._compressed = data['compressed']
+        self._compressed_bytes = sum(len(d) for d in self._compressed.values())
+        self._rebalance()
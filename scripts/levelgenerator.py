@@ -1,10 +1,24 @@
 import numpy as np # type: ignore
 import random as r
 
-from typing import Dict, Tuple, List, Literal, Optional
+from typing import Callable, Dict, Tuple, List, Literal, Optional
 import numpy.typing as npt # type: ignore
 # Import necessary entities and constants from game_data
-from game_data import Enemy, Chest, level_size, GRID_SIZE, WALK_STEPS
+from entity_placement import density_for_level, place_entities
+from game_data import Enemy, Chest, level_size, GRID_SIZE, WALK_STEPS, CAVE_FILL_PROBABILITY, CAVE_SMOOTHING_PASSES, BSP_MIN_LEAF_SIZE, LEVEL_GENERATOR_SCHEDULE
+
+# --- Generator Registry ---
+# Every generator takes a grid size and returns a map using the key
+# 0=Wall, 1=Floor, 2=Entrance, 4=Exit with the exit reachable from the entrance.
+GeneratorFunc = Callable[[int], npt.NDArray[np.int_]]
+GENERATORS: Dict[str, GeneratorFunc] = {}
+
+def register_generator(name: str) -> Callable[[GeneratorFunc], GeneratorFunc]:
+    """Decorator that adds a map generator to GENERATORS under the given name."""
+    def decorator(func: GeneratorFunc) -> GeneratorFunc:
+        GENERATORS[name] = func
+        return func
+    return decorator
 
 def generate_random_walk_dungeon(grid_size: int, steps: int) -> npt.NDArray[np.int_]:
     """Generates a dungeon map using a random walk algorithm.
@@ -36,19 +50,181 @@ def generate_random_walk_dungeon(grid_size: int, steps: int) -> npt.NDArray[np.i
             row, col = new_row, new_col
             grid[row, col] = 1 # Mark the current position as a floor tile
 
-    # 1. Place the Exit tile (4) on a random floor space (1)
+    # 1. Set the entrance tile (2) where the walk started
+    grid[grid_size // 2, grid_size // 2] = 2 
+
+    # 2. Place the Exit tile (4) on a random floor space (1)
+    # Done after the entrance so the entrance can never overwrite the exit
     floor_tiles = np.argwhere(grid == 1)
     if floor_tiles.size > 0:
         # Choose a random floor tile for the exit
         exit_index = r.randint(0, len(floor_tiles) - 1)
         exit_y, exit_x = floor_tiles[exit_index]
         grid[exit_y, exit_x] = 4 # 4 represents the exit tile '>'
-        
-    # 2. Set the entrance tile (2) where the walk started
-    grid[grid_size // 2, grid_size // 2] = 2 
 
     return grid
 
+@register_generator("random_walk")
+def generate_random_walk_level(grid_size: int) -> npt.NDArray[np.int_]:
+    """Random walk generator with the walk length scaled to the map area."""
+    steps = int(WALK_STEPS * (grid_size / GRID_SIZE) ** 2)
+    return generate_random_walk_dungeon(grid_size, steps)
+
+def bfs_distances(passable: npt.NDArray[np.bool_], sources: List[Tuple[int, int]], stop_at: Optional[Tuple[int, int]] = None) -> npt.NDArray[np.int_]:
+    """Returns BFS step distances from the nearest source over passable tiles (-1 where unreachable).
+
+    Expands the whole frontier per step with array operations instead of a per-tile queue.
+    If stop_at is given the search ends as soon as that tile has a distance.
+    """
+    height, width = passable.shape
+    # Pad with walls so neighbour indexes never leave the grid
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = passable
+    open_flat = padded.ravel()
+    dist = np.full(open_flat.size, -1, dtype=np.int32)
+    # Scratch array used to drop duplicate neighbours without sorting
+    claim = np.zeros(open_flat.size, dtype=np.int64)
+
+    pw = width + 2
+    offsets = np.array([-pw, pw, -1, 1])
+    frontier = np.unique(np.array([(y + 1) * pw + x + 1 for y, x in sources], dtype=np.int64))
+    dist[frontier] = 0
+    target = (stop_at[0] + 1) * pw + stop_at[1] + 1 if stop_at is not None else -1
+    step = 0
+    while frontier.size:
+        if target >= 0 and dist[target] >= 0:
+            break
+        step += 1
+        neighbours = (frontier[:, None] + offsets).ravel()
+        neighbours = neighbours[open_flat[neighbours] & (dist[neighbours] < 0)]
+        # Last write wins, so each tile keeps exactly one of its duplicate entries
+        order = np.arange(neighbours.size)
+        claim[neighbours] = order
+        frontier = neighbours[claim[neighbours] == order]
+        dist[frontier] = step
+
+    return dist.reshape(height + 2, width + 2)[1:-1, 1:-1]
+
+def _place_entrance_and_exit(grid: npt.NDArray[np.int_], start: Tuple[int, int]) -> npt.NDArray[np.int_]:
+    """Walls off floor not connected to start, then sets the entrance (2) at start and the exit (4) on the farthest tile."""
+    dist = bfs_distances(grid == 1, [start])
+    grid[(grid == 1) & (dist < 0)] = 0
+    exit_y, exit_x = np.unravel_index(np.argmax(dist), dist.shape)
+    grid[exit_y, exit_x] = 4
+    grid[start] = 2
+    return grid
+
+def _largest_region(passable: npt.NDArray[np.bool_], centre: Tuple[int, int]) -> Optional[npt.NDArray[np.bool_]]:
+    """Returns a mask of the largest 4-connected passable region, or None if nothing is passable.
+
+    Regions are flooded one at a time with bfs_distances, starting from the one nearest
+    the centre (usually the big one), and the search stops once the unvisited tiles
+    could no longer form a larger region.
+    """
+    unvisited = passable.copy()
+    best: Optional[npt.NDArray[np.bool_]] = None
+    best_size = 0
+    remaining = int(np.count_nonzero(unvisited))
+    while remaining > best_size:
+        tiles = np.argwhere(unvisited)
+        nearest = np.argmin(np.abs(tiles - centre).sum(axis=1))
+        region = bfs_distances(unvisited, [tuple(tiles[nearest])]) >= 0
+        size = int(np.count_nonzero(region))
+        if size > best_size:
+            best, best_size = region, size
+        unvisited &= ~region
+        remaining -= size
+    return best
+
+@register_generator("cave")
+def generate_cellular_automata_cave(grid_size: int) -> npt.NDArray[np.int_]:
+    """Generates an organic cave with cellular-automata smoothing.
+
+    Each pass counts the 8 neighbouring walls of every tile at once by summing shifted
+    slices of a padded array (a 3x3 convolution), then applies the 4-5 rule.
+    """
+    rng = np.random.default_rng(r.getrandbits(32)) # Follows the random module's seed
+    walls = rng.random((grid_size, grid_size)) < CAVE_FILL_PROBABILITY
+
+    for _ in range(CAVE_SMOOTHING_PASSES):
+        # Out-of-bounds tiles count as walls
+        padded = np.ones((grid_size + 2, grid_size + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = walls
+        neighbours = np.zeros((grid_size, grid_size), dtype=np.uint8)
+        for dy in range(3):
+            for dx in range(3):
+                if dy != 1 or dx != 1:
+                    neighbours += padded[dy:dy + grid_size, dx:dx + grid_size]
+        walls = (neighbours >= 5) | (walls & (neighbours >= 4))
+
+    grid: npt.NDArray[np.int_] = np.where(walls, 0, 1)
+    # Keep a solid border like the other generators' outer walls
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 0
+
+    region = _largest_region(grid == 1, (grid_size // 2, grid_size // 2))
+    if region is None:
+        # Degenerate fill, fall back to a random walk map
+        return generate_random_walk_level(grid_size)
+    # Start on the tile of the largest cave nearest the centre
+    floor_tiles = np.argwhere(region)
+    nearest = np.argmin(np.abs(floor_tiles - grid_size // 2).sum(axis=1))
+    return _place_entrance_and_exit(grid, tuple(floor_tiles[nearest]))
+
+def _split_bsp(y: int, x: int, h: int, w: int, grid: npt.NDArray[np.int_], rooms: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """Recursively splits a region, carves rooms in the leaves and joins the halves with corridors.
+
+    Returns the centre of one room inside the region so the caller can connect to it.
+    """
+    can_split_h = h >= 2 * BSP_MIN_LEAF_SIZE
+    can_split_w = w >= 2 * BSP_MIN_LEAF_SIZE
+
+    if not can_split_h and not can_split_w:
+        # Leaf: carve a room leaving at least one wall tile around it
+        room_h = r.randint(max(2, h // 2), max(2, h - 2))
+        room_w = r.randint(max(2, w // 2), max(2, w - 2))
+        room_y = y + r.randint(1, max(1, h - room_h - 1))
+        room_x = x + r.randint(1, max(1, w - room_w - 1))
+        grid[room_y:room_y + room_h, room_x:room_x + room_w] = 1
+        centre = (room_y + room_h // 2, room_x + room_w // 2)
+        rooms.append(centre)
+        return centre
+
+    # Split across the longer side when both are possible
+    if can_split_h and (not can_split_w or h > w or (h == w and r.random() < 0.5)):
+        cut = r.randint(BSP_MIN_LEAF_SIZE, h - BSP_MIN_LEAF_SIZE)
+        first = _split_bsp(y, x, cut, w, grid, rooms)
+        second = _split_bsp(y + cut, x, h - cut, w, grid, rooms)
+    else:
+        cut = r.randint(BSP_MIN_LEAF_SIZE, w - BSP_MIN_LEAF_SIZE)
+        first = _split_bsp(y, x, h, cut, grid, rooms)
+        second = _split_bsp(y, x + cut, h, w - cut, grid, rooms)
+
+    # L-shaped corridor between the two halves
+    (y1, x1), (y2, x2) = first, second
+    grid[min(y1, y2):max(y1, y2) + 1, x1] = 1
+    grid[y2, min(x1, x2):max(x1, x2) + 1] = 1
+    return first if r.random() < 0.5 else second
+
+@register_generator("bsp")
+def generate_bsp_dungeon(grid_size: int) -> npt.NDArray[np.int_]:
+    """Generates rooms joined by corridors using binary space partitioning."""
+    grid: npt.NDArray[np.int_] = np.zeros((grid_size, grid_size), dtype=int)
+    rooms: List[Tuple[int, int]] = []
+    _split_bsp(0, 0, grid_size, grid_size, grid, rooms)
+    # Enter in a random room, exit in the room farthest away
+    return _place_entrance_and_exit(grid, r.choice(rooms))
+
+def select_generator(level: int) -> str:
+    """Returns the generator name used for a level, cycling LEVEL_GENERATOR_SCHEDULE."""
+    return LEVEL_GENERATOR_SCHEDULE[(level - 1) % len(LEVEL_GENERATOR_SCHEDULE)]
+
+def generate_level(level: int, grid_size: int = GRID_SIZE, generator: Optional[str] = None) -> npt.NDArray[np.int_]:
+    """Generates the map for a level with the named generator, or the scheduled one for that level."""
+    name = generator if generator is not None else select_generator(level)
+    if name not in GENERATORS:
+        raise ValueError(f"Unknown map generator: {name}")
+    return GENERATORS[name](grid_size)
+
 def find_entrance(dungeon_map: npt.NDArray[np.int_]) -> Tuple[int, int]:
     """Finds the coordinates (y, x) of the entrance tile (2)."""
     # np.argwhere returns a list of (row, col) tuples
@@ -59,47 +235,32 @@ def find_entrance(dungeon_map: npt.NDArray[np.int_]) -> Tuple[int, int]:
     grid_size = dungeon_map.shape[0]
     return grid_size // 2, grid_size // 2
 
-def get_unique_tile(floor_tiles: npt.NDArray[np.int_], used_tiles: set) -> Optional[Tuple[int, int]]:
-    """Returns the (y, x) coordinates of a unique floor tile, avoiding tiles already used for entities."""
-    # floor_tiles are (row, col) which is (y, x)
-    # We must also ensure we don't place entities on the Exit tile (4)
-    for y, x in floor_tiles: 
-        if (y, x) not in used_tiles: # Check using (y, x) format
-            used_tiles.add((y, x)) # Add using (y, x) format
-            return (y, x) # Return as (y, x)
-    return None
-
-def generate_entities(dungeon_map: npt.NDArray[np.int_]) -> Tuple[List[Enemy], List[Chest]]:
-    """Places enemies and chests randomly on valid floor tiles (1) in the dungeon map, avoiding Exits (4)."""
-    
-    # Only consider floor tiles (1) for entity placement
-    # We explicitly exclude tile 4 (Exit) since generate_random_walk_dungeon sets it
-    valid_tiles = np.argwhere(dungeon_map == 1) 
-    r.shuffle(valid_tiles)
-
-    enemies: List[Enemy] = []
-    chests: List[Chest] = []
-
-    # Simple logic: up to 3 enemies and 1 chest (based on available tiles)
-    num_enemies = min(r.randint(1, 3), len(valid_tiles) // 3)
-    num_chests = min(1, len(valid_tiles) // 4)
-
-    # Place entities on unique floor tiles
-    used_tiles = set()
-
-    # Place enemies
-    for _ in range(num_enemies):
-        result = get_unique_tile(valid_tiles, used_tiles)
-        if result is not None:
-            y, x = result
-            # Enemy health scales slightly with level, assuming level is > 0
-            enemies.append(Enemy(y, x, health=r.randint(2, 3)))
-
-    # Place chests
-    for _ in range(num_chests):
-        result = get_unique_tile(valid_tiles, used_tiles)
-        if result is not None:
-            y, x = result
-            chests.append(Chest(y, x, item=r.choice(["Sword", "Poison Bow", "Iron Armour"])))
-            
+def find_exit(dungeon_map: npt.NDArray[np.int_]) -> Tuple[int, int]:
+    """Finds the coordinates (y, x) of the exit tile (4)."""
+    exit_coords = np.argwhere(dungeon_map == 4)
+    if exit_coords.size > 0:
+        return tuple(exit_coords[0])
+    # Fallback to the entrance if the map has no exit
+    return find_entrance(dungeon_map)
+
+def generate_entities(dungeon_map: npt.NDArray[np.int_], level: int = 1) -> Tuple[List[Enemy], List[Chest]]:
+    """Places enemies and chests on floor tiles (1) with Poisson-disk spacing, away from the entrance (2) and exit (4).
+
+    Entity counts follow the level's density targets, with at least one enemy and one chest.
+    """
+    floor_count = int(np.count_nonzero(dungeon_map == 1))
+    enemy_density, chest_density = density_for_level(level)
+
+    # Keep some free floor on tiny maps, like the old one-entity-per-few-tiles limit
+    num_enemies = min(max(1, round(floor_count * enemy_density)), floor_count // 3)
+    num_chests = min(max(1, round(floor_count * chest_density)), floor_count // 4)
+
+    enemy_tiles, chest_tiles = place_entities(dungeon_map, num_enemies, num_chests)
+
+    # Health and items for every entity in one draw, seeded from the random module like the placement
+    rng = np.random.default_rng(r.getrandbits(32))
+    healths = rng.integers(2, 4, len(enemy_tiles)).tolist()
+    items = rng.choice(["Sword", "Poison Bow", "Iron Armour"], len(chest_tiles)).tolist()
+    enemies: List[Enemy] = [Enemy(y, x, health=health) for (y, x), health in zip(enemy_tiles, healths)]
+    chests: List[Chest] = [Chest(y, x, item=item) for (y, x), item in zip(chest_tiles, items)]
     return enemies, chests
@@ -1,12 +1,26 @@
+import argparse
 from typing import List, Tuple, Optional, Callable, Dict
 import numpy as np # type: ignore
 import numpy.typing as npt # type: ignore
 from fight import enemy_encounter
 # Ensure all necessary classes and constants are imported from game_data
-from game_data import Enemy, Player, Chest, MAP_SYMBOLS, GRID_SIZE, WALK_STEPS, GameState, clear_terminal 
+from game_data import Enemy, Player, Chest, MAP_SYMBOLS, GRID_SIZE, WALK_STEPS, LEVEL_CACHE_HOT_RADIUS, LEVEL_CACHE_MAX_BYTES, GameState, clear_terminal 
 # These functions are required by initialize_game and handle_player_action
 from progress_saver import save_game_prompt, load_game_prompt 
-from levelgenerator import generate_random_walk_dungeon, find_entrance, generate_entities
+from levelgenerator import generate_level, find_entrance, find_exit, generate_entities
+from level_cache import LevelCache
+from spectator import SpectatorServer
+from combat_ai import MCTSEnemyAI
+from travel import find_path, living_enemy_tiles, enemy_adjacent, explore_goals
+from event_log import record_event, set_event_context, open_event_log, close_event_log, EVENT_MOVE, EVENT_STATUS, EVENT_CHEST, EVENT_LEVEL, STATUS_IDS, ITEM_IDS
+
+# Optional smarter opponent used in every fight (None keeps the random enemy)
+ENEMY_AI: Optional[MCTSEnemyAI] = None
+# Live stream for spectators, set by main() when --spectate is given
+SPECTATORS: Optional[SpectatorServer] = None
+
+# Position change for each movement command, used to check travel steps
+MOVE_DELTAS: Dict[str, Tuple[int, int]] = {'W': (-1, 0), 'S': (1, 0), 'A': (0, -1), 'D': (0, 1)}
 
 # --- Game Logic Functions ---
 
@@ -67,7 +81,7 @@ def print_grid(state: GameState) -> None:
     for row in grid_symbols:
         print(' '.join(row))
 
-    print("\nCommand: (W/A/S/D) Move, (H) Heal, (T) Save, (Q)uit") 
+    print("\nCommand: (W/A/S/D) Move, (X) To exit, (C) To chest, (G)o to, (E)xplore, (H) Heal, (T) Save, (Q)uit") 
 
 def handle_player_action(state: GameState, action: str) -> str:
     """Handles non-movement actions like Heal or Save."""
@@ -146,6 +160,75 @@ def handle_player_action(state: GameState, action: str) -> str:
         
     return "Invalid"
 
+def walk_path(state: GameState, path: List[str]) -> int:
+    """Walks a path one move at a time through update_game_state without redrawing the grid.
+
+    Every step after the first is a new turn, so status effects tick before it (the first
+    step's tick was applied by handle_playing). Stops early when the walk triggers
+    anything: a fight or level change, a chest, a blocked step, a status effect ticking,
+    or a living enemy coming next to the player. Returns the number of steps taken.
+    """
+    steps = 0
+    for direction in path:
+        status_ticked = False
+        if steps > 0:
+            status_ticked = state.player.status != "None"
+            apply_status_effects(state)
+            if state.game_state != "playing":
+                break
+
+        dy, dx = MOVE_DELTAS[direction]
+        expected = (state.player.y + dy, state.player.x + dx)
+        chests_opened = sum(1 for c in state.chests if c.opened)
+
+        update_game_state(state, direction)
+        steps += 1
+
+        if state.game_state != "playing" or (state.player.y, state.player.x) != expected:
+            break
+        if sum(1 for c in state.chests if c.opened) != chests_opened or enemy_adjacent(state):
+            break
+        if status_ticked:
+            break # Let the player see the damage before travelling on
+    return steps
+
+def handle_travel_command(state: GameState, action: str) -> None:
+    """Handles travel to the exit (X), the nearest chest (C), a coordinate (G), or auto-explore (E)."""
+    if action == 'X':
+        goals = [tuple(t) for t in np.argwhere(state.dungeon_map == 4)]
+        target_name = "the exit"
+    elif action == 'C':
+        goals = [(c.y, c.x) for c in state.chests if not c.opened]
+        target_name = "a chest"
+    elif action == 'G':
+        coords = input("Travel to (row col): ").replace(',', ' ').split()
+        if len(coords) != 2 or not all(c.isdigit() for c in coords):
+            print("Please enter two numbers, e.g. 3 10.")
+            input("Press Enter to continue...")
+            return
+        goals = [(int(coords[0]), int(coords[1]))]
+        height, width = state.dungeon_map.shape
+        if not (goals[0][0] < height and goals[0][1] < width):
+            print("That location is outside the map.")
+            input("Press Enter to continue...")
+            return
+        target_name = "that location"
+    else:
+        goals = explore_goals(state)
+        target_name = "anything left to explore"
+
+    path = find_path(state.dungeon_map, (state.player.y, state.player.x), goals, living_enemy_tiles(state))
+    if path is None:
+        print(f"There is no path to {target_name}.")
+        input("Press Enter to continue...")
+        return
+    if not path:
+        print("An enemy is right next to you!" if enemy_adjacent(state) else "You are already there.")
+        input("Press Enter to continue...")
+        return
+
+    walk_path(state, path)
+
 def initialize_game(load: bool = True) -> GameState:
     """Handles initial player setup or loads a saved game."""
     
@@ -161,27 +244,71 @@ def initialize_game(load: bool = True) -> GameState:
     state = GameState(name, player)
     return state
 
+def get_level_cache(state: GameState) -> LevelCache:
+    """Returns the state's level cache, creating one for saves made before it existed."""
+    if getattr(state, 'level_cache', None) is None:
+        state.level_cache = LevelCache(LEVEL_CACHE_HOT_RADIUS, LEVEL_CACHE_MAX_BYTES)
+    return state.level_cache
+
+def store_current_level(state: GameState) -> None:
+    """Keeps the level being left in the cache so it can be revisited."""
+    if state.level > 0:
+        get_level_cache(state).store(state.level, state.dungeon_map, state.enemies, state.chests)
+
 def transition_to_next_level(state: GameState) -> None:
-    """Generates a new level, places the player, and updates the GameState object."""
-    dungeon_map = generate_random_walk_dungeon(GRID_SIZE, WALK_STEPS)
+    """Generates (or restores a visited) next level, places the player, and updates the GameState object."""
+    store_current_level(state)
+    cache = get_level_cache(state)
+
+    record = cache.fetch(state.level + 1)
+    if record is not None:
+        # Level was visited before, restore it as it was left
+        dungeon_map = record.dungeon_map
+        state.enemies, state.chests = record.enemies, record.chests
+    else:
+        dungeon_map = generate_level(state.level + 1, GRID_SIZE)
+        state.enemies, state.chests = generate_entities(dungeon_map, state.level + 1)
+
     start_y, start_x = find_entrance(dungeon_map)
     state.player.y, state.player.x = start_y, start_x
-    
-    state.enemies, state.chests = generate_entities(dungeon_map) 
 
     state.dungeon_map = dungeon_map
     state.level += 1
+    record_event(EVENT_LEVEL, a=state.level)
+    cache.set_current(state.level)
     state.game_state = "playing"
     clear_terminal()
     print(f"*** Level {state.level} Reached! ***")
     input("Press Enter to continue...")
 
+def transition_to_previous_level(state: GameState) -> None:
+    """Restores the previous level from the cache and places the player on its exit."""
+    state.game_state = "playing"
+    cache = get_level_cache(state)
+    record = cache.fetch(state.level - 1)
+    if record is None:
+        print("The stairs back up have collapsed.")
+        input("Press Enter to continue...")
+        return
+
+    store_current_level(state)
+    state.dungeon_map = record.dungeon_map
+    state.enemies, state.chests = record.enemies, record.chests
+    state.player.y, state.player.x = find_exit(record.dungeon_map)
+    state.level -= 1
+    record_event(EVENT_LEVEL, a=state.level)
+    cache.set_current(state.level)
+    clear_terminal()
+    print(f"*** Returned to Level {state.level} ***")
+    input("Press Enter to continue...")
+
 def apply_status_effects(state: GameState) -> None:
     """Applies and decays status effects at the start of the player's turn."""
     player = state.player
     if player.status == "Poisoned":
         player.health -= 1
         player.status_duration -= 1
+        record_event(EVENT_STATUS, STATUS_IDS["Poisoned"], b=1)
         print_UI(state) # Re-print UI to show damage
         print(f"The poison bites at you, dealing 1 damage! {player.health} health remaining.")
         if player.status_duration <= 0:
@@ -204,9 +331,10 @@ def update_game_state(state: GameState, action: str) -> None:
 
         if move_result == "Wall":
             return
+        record_event(EVENT_MOVE, x=state.player.x, y=state.player.y)
 
         # VITAL LOGIC: Check for the Exit Tile and enemy clearance
-        elif move_result == "ExitTile":
+        if move_result == "ExitTile":
             # Check if all enemies are defeated (health > 0)
             enemies_remaining = [e for e in state.enemies if e.health > 0]
             
@@ -223,8 +351,20 @@ def update_game_state(state: GameState, action: str) -> None:
                 # We do not revert the player position, just block the state transition.
                 input("Press Enter to continue...")
                 return 
+
+        # Entrance tile leads back up to the previous level
+        elif move_result == "EntranceTile" and state.level > 1:
+            go_back = input(f"Stairs lead back up to level {state.level - 1}. Go up? (Y/N): ").strip().upper()
+            if go_back == 'Y':
+                state.game_state = "previous_level_transition"
+                return
         
-    # 2. Handle Action (Heal or Save)
+    # 2. Handle Travel Commands (several moves, rendered once afterwards)
+    elif action in ('X', 'C', 'G', 'E'):
+        handle_travel_command(state, action)
+        return
+
+    # 2b. Handle Action (Heal or Save)
     elif action in ('H', 'T'):
         handle_player_action(state, action)
         return
@@ -260,6 +400,8 @@ def update_game_state(state: GameState, action: str) -> None:
     for chest in state.chests:
         if not chest.opened and (state.player.y, state.player.x) == (chest.y, chest.x):
             chest.open(state.player)
+            if chest.opened:
+                record_event(EVENT_CHEST, ITEM_IDS.get(chest.item, 0), chest.x, chest.y)
             return
 
 def handle_playing(state: GameState):
@@ -279,6 +421,10 @@ def handle_next_level_transition(state: GameState):
     """Handles the level transition state."""
     transition_to_next_level(state)
 
+def handle_previous_level_transition(state: GameState):
+    """Handles the transition back up to the previous level."""
+    transition_to_previous_level(state)
+
 def handle_enemy_encounter(state: GameState):
     """Handles the enemy encounter state."""
     if state.current_enemy:
@@ -286,7 +432,9 @@ def handle_enemy_encounter(state: GameState):
         print(f"You encountered an enemy at ({state.current_enemy.y}, {state.current_enemy.x})!")
                     
         # enemy_encounter returns (new_game_state, player_health)
-        new_state, player_health = enemy_encounter(state.game_state, state.current_enemy, state.player)
+        # Spectators get a frame per fight turn, not just the fight's result
+        on_turn = (lambda: SPECTATORS.publish(state)) if SPECTATORS else None
+        new_state, player_health = enemy_encounter(state.game_state, state.current_enemy, state.player, ENEMY_AI, on_turn)
         
         state.game_state = new_state
         state.player.health = player_health
@@ -302,22 +450,43 @@ def handle_enemy_encounter(state: GameState):
 # Maps game state names (strings) to their handler functions
 STATE_HANDLERS: Dict[str, Callable[[GameState], None]] = {
     'next_level_transition': handle_next_level_transition,
+    'previous_level_transition': handle_previous_level_transition,
     'playing': handle_playing,
     'enemy_encounter': handle_enemy_encounter
 }
 
-def main() -> None:
+def main(spectator_port: Optional[int] = None, smart_enemies: bool = False, ai_budget_ms: Optional[float] = None, event_log_path: Optional[str] = None) -> None:
     """Main game loop for continuous sessions, handling setup, transitions, and state changes."""
+    global ENEMY_AI, SPECTATORS
+    if smart_enemies:
+        ENEMY_AI = MCTSEnemyAI() if ai_budget_ms is None else MCTSEnemyAI(time_budget=ai_budget_ms / 1000)
+
+    # Optional live stream for spectators, one frame batch per handled turn
+    if spectator_port is not None:
+        SPECTATORS = SpectatorServer(port=spectator_port).start()
+        print(f"Spectators can watch on port {SPECTATORS.address[1]} (python spectator.py {SPECTATORS.address[1]})")
+        input("Press Enter to continue...")
+
+    # Optional structured log of gameplay events, flushed in the background
+    if event_log_path:
+        open_event_log(event_log_path)
+    session = 0
+    turn = 0
 
     while True:
         # Load Game Prompt is run before initialization.
         state = initialize_game(load=True)
+        session += 1
 
         while state.game_state != "game_over":
             handler = STATE_HANDLERS.get(state.game_state)
             
             if handler:
+                turn += 1
+                set_event_context(session, state.level, turn)
                 handler(state)
+                if SPECTATORS:
+                    SPECTATORS.publish(state)
             else:
                 # Fallback for an unknown state, though unlikely
                 print(f"Error: Unknown game state: {state.game_state}")
@@ -327,10 +496,23 @@ def main() -> None:
         # Case for Game Over state
         clear_terminal()
         print("Game Over!")
+        if ENEMY_AI and ENEMY_AI.total_rollouts:
+            print(ENEMY_AI.stats())
         restart = input("Do you want to play again? (Y/N): ").strip().upper()
         if restart != 'Y':
             print("Thanks for playing!")
             break
 
+    if SPECTATORS:
+        SPECTATORS.close()
+        SPECTATORS = None
+    close_event_log()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Dungeon crawler RPG")
+    parser.add_argument("--spectate", type=int, metavar="PORT", help="stream the game to spectators on this local port (0 picks a free port)")
+    parser.add_argument("--smart-enemies", action="store_true", help="enemies plan their fight moves with Monte Carlo tree search")
+    parser.add_argument("--ai-budget-ms", type=float, help="search time per enemy turn in milliseconds (default from MCTS_TIME_BUDGET)")
+    parser.add_argument("--event-log", metavar="PATH", help="record gameplay events to a binary log (read it with event_log.py)")
+    args = parser.parse_args()
+    main(spectator_port=args.spectate, smart_enemies=args.smart_enemies, ai_budget_ms=args.ai_budget_ms, event_log_path=args.event_log)
\ No newline at end of file
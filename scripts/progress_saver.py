@@ -7,6 +7,10 @@ def save_game_prompt(state: GameState) -> None:
     """Prompt the user to save the game and execute the save."""
     clear_terminal()
     print("--- Save Game ---")
+    if not getattr(state, 'saving_allowed', True): # Old saves predate the flag
+        print("Saving is not available in this session.")
+        input("Press Enter to continue...")
+        return
     action = input("Do you want to save your current progress? (Y/N): ").strip().upper()
     
     if action == 'Y':
@@ -0,0 +1,542 @@
+import argparse
+import asyncio
+import io
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import random as r
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+from game_data import GRID_SIZE, GameState, LEVEL_GENERATOR_SCHEDULE, SERVER_MAP_POOL_SIZE, SERVER_PORT, SERVER_MAX_PAUSED_TURNS, SERVER_TURN_STACK_BYTES
+from headless import AutoResponder, headless_session, new_session, run_turn
+from levelgenerator import generate_level, register_generator
+from main import print_grid
+
+# Worker request ops
+OP_OPEN = "open"      # payload: player name
+OP_COMMAND = "cmd"    # payload: command line (extra words answer its prompts), or the answer a paused turn waits on
+OP_QUIET = "quiet"    # like OP_COMMAND but replies with a status tuple and restarts finished games
+OP_CLOSE = "close"
+
+class MapPool:
+    """Pre-generated dungeon maps in one shared memory block, shape (count, size, size).
+
+    The front process generates and owns the block; workers attach by name and read the
+    maps in place, so every worker shares a single copy.
+    """
+
+    def __init__(self, shm: SharedMemory, count: int, grid_size: int, owner: bool):
+        self.shm = shm
+        self.count = count
+        self.grid_size = grid_size
+        self.owner = owner
+        self.maps: npt.NDArray[np.uint8] = np.ndarray((count, grid_size, grid_size), dtype=np.uint8, buffer=shm.buf)
+
+    @staticmethod
+    def create(count: int, grid_size: int = GRID_SIZE) -> 'MapPool':
+        """Generates count maps with the usual level schedule and stores them in a new block."""
+        shm = SharedMemory(create=True, size=count * grid_size * grid_size)
+        pool = MapPool(shm, count, grid_size, owner=True)
+        for i in range(count):
+            pool.maps[i] = generate_level(i + 1, grid_size)
+        return pool
+
+    @staticmethod
+    def attach(name: str, count: int, grid_size: int) -> 'MapPool':
+        pool = MapPool(SharedMemory(name=name), count, grid_size, owner=False)
+        pool.maps.setflags(write=False) # Shared by every session, never edited
+        return pool
+
+    def info(self) -> Tuple[str, int, int]:
+        """What a worker needs to attach."""
+        return self.shm.name, self.count, self.grid_size
+
+    def draw(self, grid_size: int) -> npt.NDArray[np.uint8]:
+        """Generator-registry entry point: a random pooled map (a read-only view, no copy)."""
+        return self.maps[r.randrange(self.count)]
+
+    def close(self) -> None:
+        del self.maps # Release the buffer export before closing
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# --- Worker process ---
+
+class _SessionClosed(Exception):
+    """Raised inside a paused turn when its connection goes away."""
+
+class _TurnThreads:
+    """Reusable threads that run interactive turns, one turn at a time.
+
+    A turn that stops at a prompt keeps its thread parked until the client answers, so a
+    worker holds one thread per paused turn plus the idle ones waiting for reuse. At most
+    `limit` turns may be paused at once; while the limit is reached new turns are refused
+    (paused ones can still be answered, which frees their threads).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.paused = 0
+        self._idle: List[queue.SimpleQueue] = [] # Job queue of each idle thread
+
+    @property
+    def full(self) -> bool:
+        return self.paused >= self.limit
+
+    def submit(self, job: Callable[[], None], on_done: Callable[[], None]) -> None:
+        """Runs job on an idle thread (or a new one), then returns the thread to the pool and calls on_done."""
+        jobs = self._idle.pop() if self._idle else self._spawn()
+        jobs.put((job, on_done))
+
+    def _spawn(self) -> queue.SimpleQueue:
+        jobs: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._serve, args=(jobs,), name="turn", daemon=True).start()
+        return jobs
+
+    def _serve(self, jobs: queue.SimpleQueue) -> None:
+        while True:
+            job, on_done = jobs.get()
+            job()
+            self._idle.append(jobs) # Before on_done, so the worker can reuse this thread right away
+            on_done()
+
+# Shared by every interactive session of this worker
+_TURN_THREADS = _TurnThreads(SERVER_MAX_PAUSED_TURNS)
+
+class _ClientResponder:
+    """input() for a network session: answers come from the client.
+
+    A turn runs on a pooled thread. When it reaches a prompt with no queued answer it
+    pauses there and hands control back to the worker, which sends the prompt to the
+    client and resumes the turn with the client's reply. "Press Enter" prompts need no
+    decision and are answered straight away.
+    """
+
+    def __init__(self, threads: _TurnThreads):
+        self.threads = threads
+        self.answers: Deque[str] = deque()
+        self.prompt: Optional[str] = None # Prompt the paused turn is waiting on
+        self.closing = False
+        self.error: Optional[Exception] = None # Raised by the last turn, for the worker to report
+        self._resume = threading.Event()
+        self._paused = threading.Event() # Set when the turn pauses or finishes
+
+    def feed(self, *answers: str) -> None:
+        self.answers.extend(answers)
+
+    def __call__(self, prompt: str = "") -> str:
+        if self.answers:
+            answer = self.answers.popleft()
+            print(prompt + answer) # Echo like a terminal would
+            return answer
+        if "Press Enter" in prompt:
+            return ""
+        self.prompt = prompt
+        self.threads.paused += 1
+        self._paused.set()
+        self._resume.wait()
+        self._resume.clear()
+        self.threads.paused -= 1
+        self.prompt = None
+        if self.closing:
+            raise _SessionClosed()
+        return self.answers.popleft() if self.answers else ""
+
+    def run(self, turn: Callable[[], None]) -> None:
+        """Starts turn on a pooled thread and waits until it pauses or finishes."""
+        def play() -> None:
+            try:
+                turn()
+            except _SessionClosed:
+                pass
+            except Exception as e:
+                self.error = e
+
+        self.error = None
+        self._paused.clear()
+        self.threads.submit(play, self._paused.set)
+        self._paused.wait()
+
+    def resume(self, *answers: str) -> None:
+        """Continues a paused turn with the client's answers and waits until it pauses again or finishes."""
+        self.feed(*answers)
+        self._paused.clear()
+        self._resume.set()
+        self._paused.wait()
+
+    def close(self) -> None:
+        """Ends a paused turn without finishing it, returning its thread to the pool."""
+        if self.prompt is not None:
+            self.closing = True
+            self.resume()
+
+class _Session:
+    __slots__ = ['state', 'responder']
+
+    def __init__(self, state: GameState, responder: _ClientResponder):
+        self.state = state
+        self.responder = responder
+
+# Answers every prompt of OP_QUIET turns, so benchmark sessions never pause
+_AUTO_RESPONDER = AutoResponder()
+
+def _new_server_state(name: str) -> GameState:
+    with headless_session(_AUTO_RESPONDER):
+        state = new_session(name)
+    state.saving_allowed = False # Every session would share the one SAVE_FILE on the server's disk
+    return state
+
+def _render(session: _Session, output: io.StringIO) -> str:
+    """What the client sees next: the turn's messages then the grid and command prompt,
+    the question a paused turn is waiting on, or the game over message."""
+    if session.responder.prompt is not None:
+        output.write(session.responder.prompt)
+    elif session.state.game_state == "playing":
+        with headless_session(session.responder, output):
+            print_grid(session.state)
+        output.write("\nCommand: ")
+    elif session.state.game_state == "game_over":
+        output.write("\nGame Over!\n")
+    return output.getvalue()
+
+def _handle(sessions: Dict[int, _Session], op: str, session_id: int, payload: str) -> Any:
+    """Runs one request against this worker's sessions."""
+    if op == OP_OPEN:
+        sessions[session_id] = _Session(_new_server_state(payload or "Player"), _ClientResponder(_TURN_THREADS))
+        return _render(sessions[session_id], io.StringIO())
+
+    session = sessions.get(session_id)
+    if op == OP_CLOSE or session is None:
+        if session is not None:
+            session.responder.close()
+        sessions.pop(session_id, None)
+        return ""
+
+    words = payload.split()
+    if op == OP_QUIET:
+        _AUTO_RESPONDER.feed(*words[1:])
+        with headless_session(_AUTO_RESPONDER):
+            run_turn(session.state, words[0] if words else "")
+            if session.state.game_state == "game_over":
+                session.state = _new_server_state(session.state.name)
+        _AUTO_RESPONDER.answers.clear()
+        return session.state.level
+
+    responder = session.responder
+    if responder.prompt is None and _TURN_THREADS.full:
+        return "The server is busy, please send the command again in a moment.\n\nCommand: "
+
+    output = io.StringIO()
+    with headless_session(responder, output):
+        if responder.prompt is not None:
+            # The line answers the paused turn's question (an empty line is an answer too)
+            responder.resume(*(words or [""]))
+        else:
+            responder.feed(*words[1:])
+            responder.run(lambda: run_turn(session.state, words[0] if words else ""))
+    if responder.error is not None:
+        raise responder.error
+    if responder.prompt is None:
+        responder.answers.clear() # Unused answers do not leak into the next turn
+    reply = _render(session, output)
+    if session.state.game_state == "game_over" and responder.prompt is None:
+        sessions.pop(session_id, None)
+    return reply
+
+def worker_main(conn: Connection, pool_info: Tuple[str, int, int], seed: int) -> None:
+    """Runs many sessions' state machines, serving batches of requests from the front process."""
+    r.seed(seed)
+    threading.stack_size(SERVER_TURN_STACK_BYTES) # Only turn threads are started in a worker
+    pool = MapPool.attach(*pool_info)
+    # New levels come from the shared pool instead of being generated per session
+    register_generator("shared_pool")(pool.draw)
+    LEVEL_GENERATOR_SCHEDULE[:] = ["shared_pool"]
+
+    sessions: Dict[int, _Session] = {}
+    try:
+        while True:
+            batch = conn.recv()
+            if batch is None:
+                break
+            replies = []
+            for request_id, op, session_id, payload in batch:
+                try:
+                    replies.append((request_id, _handle(sessions, op, session_id, payload)))
+                except Exception as e: # One broken session must not take the worker down
+                    sessions.pop(session_id, None)
+                    replies.append((request_id, f"ERROR: {e}\n"))
+            conn.send(replies)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for session in sessions.values():
+            session.responder.close()
+            session.state.level_cache.close()
+        pool.close()
+
+class WorkerPool:
+    """Starts the worker processes and routes each session to one of them."""
+
+    def __init__(self, num_workers: int, pool: MapPool):
+        ctx = mp.get_context("spawn") # Clean interpreters, nothing inherited but the pool's name
+        self.num_workers = num_workers
+        self.conns: List[Connection] = []
+        self.processes: List[Any] = []
+        for i in range(num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=worker_main, args=(child_conn, pool.info(), i + 1), daemon=True)
+            process.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+    def worker_for(self, session_id: int) -> int:
+        return session_id % self.num_workers
+
+    def close(self) -> None:
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+
+# --- Front process (connection routing) ---
+
+class Router:
+    """Batches requests per worker and hands replies back to the waiting connections.
+
+    Pipe sends happen on one sender thread per worker, so a worker that falls behind
+    only backs up its own queue and never blocks the event loop. If a worker's pipe
+    closes, its waiting and later requests fail with ConnectionError.
+    """
+
+    def __init__(self, workers: WorkerPool, loop: asyncio.AbstractEventLoop):
+        self.workers = workers
+        self.loop = loop
+        self.request_ids = itertools.count()
+        # Futures waiting on each worker, failed together if that worker goes away
+        self.pending: List[Dict[int, asyncio.Future]] = [{} for _ in range(workers.num_workers)]
+        self.dead: List[bool] = [False] * workers.num_workers
+        self.outboxes: List[queue.SimpleQueue] = [queue.SimpleQueue() for _ in range(workers.num_workers)]
+        self.senders: List[threading.Thread] = []
+        for i, conn in enumerate(workers.conns):
+            sender = threading.Thread(target=self._send_requests, args=(conn, self.outboxes[i]), name=f"worker-{i}-requests", daemon=True)
+            sender.start()
+            self.senders.append(sender)
+            threading.Thread(target=self._read_replies, args=(i, conn), name=f"worker-{i}-replies", daemon=True).start()
+
+    def request(self, op: str, session_id: int, payload: str = "") -> asyncio.Future:
+        """Queues a request for the session's worker and returns a future for its reply."""
+        worker = self.workers.worker_for(session_id)
+        future = self.loop.create_future()
+        if self.dead[worker]:
+            future.set_exception(ConnectionError(f"Worker {worker} has stopped"))
+            return future
+        request_id = next(self.request_ids)
+        self.pending[worker][request_id] = future
+        self.outboxes[worker].put((request_id, op, session_id, payload))
+        return future
+
+    def notify(self, op: str, session_id: int, payload: str = "") -> None:
+        """Queues a request whose reply nobody waits for."""
+        worker = self.workers.worker_for(session_id)
+        if not self.dead[worker]:
+            self.outboxes[worker].put((next(self.request_ids), op, session_id, payload))
+
+    def close(self) -> None:
+        """Stops the sender threads once they have sent everything queued."""
+        for outbox in self.outboxes:
+            outbox.put(None)
+        for sender in self.senders:
+            sender.join()
+
+    def _send_requests(self, conn: Connection, outbox: queue.SimpleQueue) -> None:
+        # Everything queued while the previous send was in progress goes out as one batch
+        while True:
+            batch = [outbox.get()]
+            while not outbox.empty():
+                batch.append(outbox.get())
+            stopping = batch[-1] is None
+            batch = [request for request in batch if request is not None]
+            try:
+                if batch:
+                    conn.send(batch)
+            except (BrokenPipeError, OSError):
+                return
+            if stopping:
+                return
+
+    def _read_replies(self, worker: int, conn: Connection) -> None:
+        try:
+            while True:
+                try:
+                    replies = conn.recv()
+                except (EOFError, OSError):
+                    self.loop.call_soon_threadsafe(self._fail_worker, worker)
+                    return
+                self.loop.call_soon_threadsafe(self._resolve, worker, replies)
+        except RuntimeError:
+            pass # The event loop closed first, the server is shutting down
+
+    def _resolve(self, worker: int, replies: List[Tuple[int, Any]]) -> None:
+        pending = self.pending[worker]
+        for request_id, result in replies:
+            future = pending.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    def _fail_worker(self, worker: int) -> None:
+        """Fails every request still waiting on a worker whose pipe has closed."""
+        self.dead[worker] = True
+        pending, self.pending[worker] = self.pending[worker], {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Worker {worker} has stopped"))
+
+async def _serve_connection(router: Router, session_ids: 'itertools.count[int]', reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """One TCP connection is one game session: each line is a command or an answer to the
+    question the turn is waiting on, each reply what the game printed since."""
+    session_id = next(session_ids)
+    try:
+        writer.write(b"Welcome to the dungeon. Enter your name: ")
+        await writer.drain()
+        name = (await reader.readline()).decode(errors="replace").strip()
+        reply = await router.request(OP_OPEN, session_id, name)
+        while True:
+            writer.write(reply.encode())
+            await writer.drain()
+            line = await reader.readline()
+            if not line or "Game Over!" in reply:
+                break
+            reply = await router.request(OP_COMMAND, session_id, line.decode(errors="replace"))
+    except ConnectionError:
+        # The client left, or the worker holding this session stopped
+        if not writer.is_closing():
+            writer.write(b"\nConnection to the game was lost.\n")
+    finally:
+        router.notify(OP_CLOSE, session_id)
+        writer.close()
+
+async def _run_server(host: str, port: int, workers: WorkerPool) -> None:
+    router = Router(workers, asyncio.get_running_loop())
+    session_ids = itertools.count(1)
+    server = await asyncio.start_server(lambda rd, wr: _serve_connection(router, session_ids, rd, wr), host, port)
+    print(f"Serving on {host}:{server.sockets[0].getsockname()[1]} with {workers.num_workers} worker processes")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        router.close() # Before WorkerPool.close() writes to the same pipes
+
+def serve(host: str = "127.0.0.1", port: int = SERVER_PORT, num_workers: Optional[int] = None, pool_size: int = SERVER_MAP_POOL_SIZE) -> None:
+    """Runs the sharded game server until interrupted."""
+    pool = MapPool.create(pool_size)
+    workers = WorkerPool(num_workers or os.cpu_count() or 1, pool)
+    try:
+        asyncio.run(_run_server(host, port, workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        workers.close()
+        pool.close()
+
+# --- Benchmark ---
+
+def _bench_rounds(workers: WorkerPool, by_worker: List[List[int]], rounds: int, request: Callable[[int], Tuple[int, Any]],
+                  on_reply: Callable[[int, str], None]) -> float:
+    """Sends each worker one batch per round, with request(session_id) for each of its sessions, and returns the seconds taken."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for i, conn in enumerate(workers.conns):
+            conn.send([(sid, op, sid, payload) for sid in by_worker[i] for op, payload in [request(sid)]])
+        for conn in workers.conns:
+            for sid, reply in conn.recv():
+                on_reply(sid, reply)
+    return time.perf_counter() - start
+
+def benchmark(sessions: int = 512, rounds: int = 50, worker_counts: Optional[List[int]] = None, pool_size: int = SERVER_MAP_POOL_SIZE) -> None:
+    """Measures turns per second as workers are added, driving the worker pipes directly.
+
+    Each worker count is measured twice. The quiet column runs OP_QUIET turns, whose
+    prompts are answered in-process. The served column plays the way a client does:
+    OP_COMMAND turns rendered to text, with prompts sent back and answered by a random
+    policy, and sessions reopened after a game over. Busy replies count as requests
+    but are reported separately.
+    """
+    cores = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    pool = MapPool.create(pool_size)
+    rng = r.Random(0)
+    policy = AutoResponder(rng=rng)
+    print(f"{sessions} sessions, {rounds} rounds, {cores} cores")
+    print(f"{'workers':>8} {'quiet turns/s':>14} {'speedup':>8} {'served req/s':>13} {'speedup':>8} {'busy':>6}")
+    quiet_baseline = served_baseline = 0.0
+    try:
+        for count in worker_counts:
+            workers = WorkerPool(count, pool)
+            by_worker: List[List[int]] = [[] for _ in range(count)]
+            for session_id in range(sessions):
+                by_worker[workers.worker_for(session_id)].append(session_id)
+            last_reply: Dict[int, str] = {}
+            busy = 0
+
+            def opened(session_id: int) -> Tuple[int, Any]:
+                return OP_OPEN, "Bench"
+
+            def quiet(session_id: int) -> Tuple[int, Any]:
+                return OP_QUIET, rng.choice("WASDE")
+
+            def served(session_id: int) -> Tuple[int, Any]:
+                reply = last_reply[session_id]
+                if "Game Over!" in reply:
+                    return OP_OPEN, "Bench"
+                if reply.endswith("Command: "):
+                    return OP_COMMAND, rng.choice("WASDE")
+                return OP_COMMAND, policy(reply.rsplit("\n", 1)[-1]) # Answer the prompt the turn paused on
+
+            def record(session_id: int, reply: Any) -> None:
+                nonlocal busy
+                if isinstance(reply, str): # OP_QUIET replies with a status tuple
+                    busy += reply.startswith("The server is busy")
+                last_reply[session_id] = reply
+
+            _bench_rounds(workers, by_worker, 1, opened, record)
+            quiet_elapsed = _bench_rounds(workers, by_worker, rounds, quiet, record)
+            _bench_rounds(workers, by_worker, 1, opened, record) # Fresh sessions for the served pass
+            busy = 0
+            served_elapsed = _bench_rounds(workers, by_worker, rounds, served, record)
+            workers.close()
+
+            quiet_tps = sessions * rounds / quiet_elapsed
+            served_rps = sessions * rounds / served_elapsed
+            quiet_baseline = quiet_baseline or quiet_tps
+            served_baseline = served_baseline or served_rps
+            print(f"{count:>8} {quiet_tps:>14,.0f} {quiet_tps / quiet_baseline:>7.2f}x {served_rps:>13,.0f} {served_rps / served_baseline:>7.2f}x {busy:>6}")
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--pool-size", type=int, default=SERVER_MAP_POOL_SIZE, help="pre-generated maps shared by all workers")
+    parser.add_argument("--bench", action="store_true", help="measure throughput scaling instead of serving")
+    parser.add_argument("--sessions", type=int, default=512, help="sessions driven by --bench")
+    parser.add_argument("--rounds", type=int, default=50, help="turns per session in --bench")
+    args = parser.parse_args()
+    if args.bench:
+        benchmark(args.sessions, args.rounds, [args.workers] if args.workers else None, args.pool_size)
+    else:
+        serve(args.host, args.port, args.workers, args.pool_size)
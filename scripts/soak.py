@@ -0,0 +1,214 @@
+import argparse
+import os
+import random as r
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Iterator, List, Optional
+import numpy as np # type: ignore
+from game_data import GameState
+from headless import AutoResponder, headless_session, new_session, run_turn
+from travel import STEP_COMMANDS, find_path, living_enemy_tiles
+
+# --- Soak Test Defaults ---
+SOAK_TURNS: int = 1_000_000
+SOAK_SAMPLE_EVERY: int = 20_000
+SOAK_SAVE_EVERY: int = 5_000
+SOAK_WARMUP_SAMPLES: int = 3
+# Allowed growth over the warm-up baseline before the run fails
+SOAK_MAX_MEMORY_GROWTH: float = 0.25
+SOAK_MAX_SLOWDOWN: float = 0.5
+# Small absolute slack so tiny baselines do not trip the memory check
+SOAK_MEMORY_SLACK_BYTES: int = 2 * 1024 * 1024
+# Player health in god mode, refilled every turn so deep runs never end in death
+SOAK_GOD_HEALTH: int = 1000
+
+def read_rss_bytes() -> int:
+    """Returns the current resident set size, or the peak RSS where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def random_actions(rng: r.Random, state_ref: List[GameState]) -> Iterator[str]:
+    """Yields moves along BFS paths to chests and living enemies, then the exit, with random noise and heals.
+
+    A path is planned with travel.find_path and followed until the player ends up somewhere
+    the plan did not expect (a fight, a new level, a random step), then planned again.
+    """
+    path: List[str] = []
+    expected: Optional[tuple] = None
+    while True:
+        state = state_ref[0]
+        player = state.player
+        here = (state, state.level, player.y, player.x)
+        if here != expected:
+            path = []
+
+        roll = rng.random()
+        if roll < 0.02:
+            expected = None
+            yield 'H'
+            continue
+        if roll < 0.07:
+            expected = None
+            yield rng.choice('WASD')
+            continue
+
+        if not path:
+            # Enemies are goals (stepping on one starts the fight) and block every other route
+            enemies = living_enemy_tiles(state)
+            goals = [(c.y, c.x) for c in state.chests if not c.opened] + list(enemies)
+            if not goals:
+                goals = [tuple(t) for t in np.argwhere(state.dungeon_map == 4)]
+            path = find_path(state.dungeon_map, (player.y, player.x), goals, enemies) or []
+            path.reverse() # Pop from the end
+        if not path:
+            expected = None
+            yield rng.choice('WASD')
+            continue
+
+        command = path.pop()
+        dy, dx = next((dy, dx) for dy, dx, c in STEP_COMMANDS if c == command)
+        expected = (state, state.level, player.y + dy, player.x + dx)
+        yield command
+
+def scripted_actions(path: str) -> Iterator[str]:
+    """Cycles through the commands in a file, one per line."""
+    with open(path) as f:
+        commands = [line.strip().upper() for line in f if line.strip()]
+    if not commands:
+        raise ValueError(f"No commands found in {path}")
+    while True:
+        yield from commands
+
+def run_soak(turns: int = SOAK_TURNS, sample_every: int = SOAK_SAMPLE_EVERY, save_every: int = SOAK_SAVE_EVERY,
+             warmup_samples: int = SOAK_WARMUP_SAMPLES, max_memory_growth: float = SOAK_MAX_MEMORY_GROWTH,
+             max_slowdown: float = SOAK_MAX_SLOWDOWN, seed: Optional[int] = None, script: Optional[str] = None,
+             trace: bool = True, god_mode: bool = False) -> bool:
+    """Plays the game headlessly for many turns and returns False if memory or throughput degrade.
+
+    Every sample records turns per second, tracemalloc's traced memory and RSS. The average
+    of the first warmup_samples samples is the baseline the later samples are checked against.
+    A sample interval in which no level was completed and no game ended fails the run, since
+    a stuck bot would otherwise keep re-testing the same level.
+    """
+    rng = r.Random(seed)
+    if seed is not None:
+        r.seed(seed) # Level generation and fights use the random module
+    responder = AutoResponder(rng=rng)
+    save_dir = tempfile.TemporaryDirectory(prefix="rpg_soak_")
+    save_path = os.path.join(save_dir.name, "soak_save.dat")
+
+    if trace:
+        tracemalloc.start()
+
+    def start_game() -> GameState:
+        state = new_session()
+        if god_mode:
+            state.player.health = state.player.max_health = SOAK_GOD_HEALTH
+        return state
+
+    with headless_session(responder):
+        state_ref = [start_game()]
+        actions = scripted_actions(script) if script else random_actions(rng, state_ref)
+
+    baseline_memory = baseline_rss = baseline_tps = 0.0
+    samples: List[tuple] = []
+    games = 1
+    levels = 0
+    max_level = 0
+    save_bytes = 0
+    last_progress = (games, levels)
+    ok = True
+    interval_start = time.perf_counter()
+
+    try:
+        print(f"{'turn':>10} {'turns/s':>10} {'traced MB':>10} {'RSS MB':>8} {'games':>6} {'levels':>7} {'max lvl':>7} {'paged':>6} {'save KB':>8}")
+        turn = 0
+        while turn < turns:
+            # One headless session per sample interval, left only to print the sample line
+            with headless_session(responder):
+                for turn in range(turn + 1, min(turns, turn + sample_every) + 1):
+                    state = state_ref[0]
+                    if state.game_state == "game_over":
+                        state.level_cache.close()
+                        state = state_ref[0] = start_game()
+                        games += 1
+                    if god_mode:
+                        state.player.health = state.player.max_health
+
+                    level_before = state.level
+                    run_turn(state, next(actions))
+                    if state.level > level_before:
+                        levels += 1
+                        max_level = max(max_level, state.level)
+
+                    # Save/load round-trip through a real file, continuing with the loaded copy
+                    if turn % save_every == 0 and state.game_state != "game_over":
+                        state.save_to_file(save_path)
+                        save_bytes = os.path.getsize(save_path)
+                        loaded = GameState.load_from_file(save_path)
+                        if loaded is not None:
+                            state.level_cache.close()
+                            state_ref[0] = loaded
+
+            if turn % sample_every == 0:
+                now = time.perf_counter()
+                tps = sample_every / (now - interval_start)
+                traced = tracemalloc.get_traced_memory()[0] if trace else 0
+                rss = read_rss_bytes()
+                samples.append((turn, tps, traced, rss))
+                print(f"{turn:>10} {tps:>10.0f} {traced / 2**20:>10.2f} {rss / 2**20:>8.1f} {games:>6} {levels:>7} {max_level:>7} {state_ref[0].level_cache.paged_levels:>6} {save_bytes / 1024:>8.1f}")
+
+                if (games, levels) == last_progress:
+                    print(f"FAIL: no level completed and no game finished in the last {sample_every} turns")
+                    ok = False
+                last_progress = (games, levels)
+
+                if len(samples) == warmup_samples:
+                    baseline_tps = sum(s[1] for s in samples) / warmup_samples
+                    baseline_memory = sum(s[2] for s in samples) / warmup_samples
+                    baseline_rss = sum(s[3] for s in samples) / warmup_samples
+                elif len(samples) > warmup_samples:
+                    if trace and traced > baseline_memory * (1 + max_memory_growth) + SOAK_MEMORY_SLACK_BYTES:
+                        print(f"FAIL: traced memory grew to {traced / 2**20:.2f} MB (baseline {baseline_memory / 2**20:.2f} MB)")
+                        ok = False
+                    if rss > baseline_rss * (1 + max_memory_growth) + SOAK_MEMORY_SLACK_BYTES:
+                        print(f"FAIL: RSS grew to {rss / 2**20:.1f} MB (baseline {baseline_rss / 2**20:.1f} MB)")
+                        ok = False
+                    if tps < baseline_tps * (1 - max_slowdown):
+                        print(f"FAIL: throughput fell to {tps:.0f} turns/s (baseline {baseline_tps:.0f})")
+                        ok = False
+                if not ok:
+                    break
+                interval_start = time.perf_counter()
+    finally:
+        if trace:
+            tracemalloc.stop()
+        state_ref[0].level_cache.close()
+        save_dir.cleanup() # Never leave the save file behind, even when a run is interrupted
+    print("Soak test passed." if ok else "Soak test failed.")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running soak test that plays the game headlessly")
+    parser.add_argument("--turns", type=int, default=SOAK_TURNS)
+    parser.add_argument("--sample-every", type=int, default=SOAK_SAMPLE_EVERY)
+    parser.add_argument("--save-every", type=int, default=SOAK_SAVE_EVERY)
+    parser.add_argument("--warmup-samples", type=int, default=SOAK_WARMUP_SAMPLES)
+    parser.add_argument("--max-memory-growth", type=float, default=SOAK_MAX_MEMORY_GROWTH, help="allowed fractional growth over the baseline")
+    parser.add_argument("--max-slowdown", type=float, default=SOAK_MAX_SLOWDOWN, help="allowed fractional drop in turns/s")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--script", help="file of commands (one per line) to cycle instead of random play")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip tracemalloc for full-speed runs")
+    parser.add_argument("--god-mode", action="store_true", help="keep the player alive so one game goes many levels deep")
+    args = parser.parse_args()
+    passed = run_soak(args.turns, args.sample_every, args.save_every, args.warmup_samples, args.max_memory_growth,
+                      args.max_slowdown, args.seed, args.script, not args.no_tracemalloc, args.god_mode)
+    sys.exit(0 if passed else 1)
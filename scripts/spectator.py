@@ -0,0 +1,341 @@
+import base64
+import json
+import selectors
+import socket
+import sys
+import threading
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np # type: ignore
+from game_data import GameState, MAP_SYMBOLS, SPECTATOR_MAX_PENDING_FRAMES, SPECTATOR_MAX_RESYNCS, clear_terminal
+
+# Frame types sent to viewers, one JSON object per line
+FRAME_KEYFRAME = "k"
+FRAME_DELTA = "d"
+
+def _snapshot(state: GameState) -> Dict[str, Any]:
+    """Captures the parts of the game a spectator sees."""
+    player = state.player
+    return {
+        "level": state.level,
+        "dungeon_map": state.dungeon_map, # Levels replace the array rather than editing it
+        "player": [int(player.y), int(player.x), int(player.health), int(player.max_health)],
+        "enemies": [[int(e.y), int(e.x), int(e.health)] for e in state.enemies],
+        "chests": [[int(c.y), int(c.x), bool(c.opened)] for c in state.chests],
+    }
+
+def _encode(frame: Dict[str, Any]) -> bytes:
+    """Encodes a frame as one compact JSON line."""
+    return json.dumps(frame, separators=(',', ':')).encode() + b"\n"
+
+class _Viewer:
+    """One attached spectator and its queue of frames waiting to be sent."""
+    __slots__ = ['sock', 'frames', 'offset', 'needs_keyframe', 'resyncs']
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.frames: Deque[bytes] = deque()
+        self.offset: int = 0 # Bytes of frames[0] already sent
+        self.needs_keyframe: bool = True
+        self.resyncs: int = 0
+
+class SpectatorServer:
+    """Streams a running game to any number of local viewers.
+
+    A viewer first gets a keyframe (the compressed dungeon_map plus every entity), then one
+    delta per tick with only what changed. Each frame is encoded once and shared by every
+    viewer. Viewers that fall more than max_pending_frames behind have their queued deltas
+    dropped and are resynced with a keyframe; after max_resyncs resyncs without catching
+    up they are disconnected, so a slow viewer never stalls the game.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_pending_frames: int = SPECTATOR_MAX_PENDING_FRAMES, max_resyncs: int = SPECTATOR_MAX_RESYNCS):
+        self.max_pending_frames: int = max_pending_frames
+        self.max_resyncs: int = max_resyncs
+        self.tick: int = 0
+        self._viewers: Dict[socket.socket, _Viewer] = {}
+        self._lock = threading.Lock()
+        self._last: Optional[Dict[str, Any]] = None
+        self._pending_drops: List[_Viewer] = []
+        self._running: bool = False
+
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen()
+        self._listener.setblocking(False)
+        self.address: Tuple[str, int] = self._listener.getsockname()
+
+        # Lets publish() wake the network thread as soon as frames are queued
+        self._wake_recv, self._wake_send = socket.socketpair()
+        self._wake_recv.setblocking(False)
+        self._wake_send.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._thread = threading.Thread(target=self._serve, name="spectator-server", daemon=True)
+
+    @property
+    def viewer_count(self) -> int:
+        with self._lock:
+            return len(self._viewers)
+
+    def start(self) -> 'SpectatorServer':
+        """Starts accepting viewers on a background thread."""
+        self._running = True
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Disconnects every viewer and stops the server."""
+        self._running = False
+        self._wake()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        with self._lock:
+            for viewer in self._viewers.values():
+                viewer.sock.close()
+            self._viewers.clear()
+        self._listener.close()
+        self._wake_recv.close()
+        self._wake_send.close()
+        self._selector.close()
+
+    # --- Game thread side ---
+
+    def publish(self, state: GameState) -> None:
+        """Queues this tick's changes for every viewer. Call once per turn."""
+        snapshot = _snapshot(state)
+        self.tick += 1
+        previous, self._last = self._last, snapshot
+
+        delta: Optional[bytes] = None
+        keyframe: Optional[bytes] = None
+        full_refresh = previous is None or self._needs_keyframe(previous, snapshot)
+
+        with self._lock:
+            for viewer in list(self._viewers.values()):
+                if viewer.needs_keyframe or full_refresh:
+                    if keyframe is None:
+                        keyframe = self._keyframe(snapshot)
+                    self._queue(viewer, keyframe, is_keyframe=True)
+                else:
+                    if delta is None:
+                        delta = self._delta(previous, snapshot)
+                    if delta:
+                        self._queue(viewer, delta, is_keyframe=False)
+        self._wake()
+
+    def _needs_keyframe(self, previous: Dict[str, Any], snapshot: Dict[str, Any]) -> bool:
+        """A new or revisited level (or a changed entity list) cannot be described as a delta."""
+        return (previous["level"] != snapshot["level"] or previous["dungeon_map"] is not snapshot["dungeon_map"]
+                or len(previous["enemies"]) != len(snapshot["enemies"])
+                or len(previous["chests"]) != len(snapshot["chests"]))
+
+    def _keyframe(self, snapshot: Dict[str, Any]) -> bytes:
+        """Encodes the full view: compressed map bytes plus every entity."""
+        dungeon_map = np.asarray(snapshot["dungeon_map"], dtype=np.uint8)
+        return _encode({
+            "t": FRAME_KEYFRAME,
+            "tick": self.tick,
+            "level": snapshot["level"],
+            "shape": list(dungeon_map.shape),
+            "map": base64.b64encode(zlib.compress(dungeon_map.tobytes())).decode(),
+            "player": snapshot["player"],
+            "enemies": snapshot["enemies"],
+            "chests": snapshot["chests"],
+        })
+
+    def _delta(self, previous: Dict[str, Any], snapshot: Dict[str, Any]) -> bytes:
+        """Encodes what changed since the previous tick, or b'' if nothing did."""
+        frame: Dict[str, Any] = {"t": FRAME_DELTA, "tick": self.tick}
+        if snapshot["player"] != previous["player"]:
+            frame["p"] = snapshot["player"]
+
+        moved: List[List[int]] = []
+        health: List[List[int]] = []
+        for i, (old, new) in enumerate(zip(previous["enemies"], snapshot["enemies"])):
+            if old[:2] != new[:2]:
+                moved.append([i, new[0], new[1]])
+            if old[2] != new[2]:
+                health.append([i, new[2]])
+        if moved:
+            frame["m"] = moved
+        if health:
+            frame["h"] = health
+
+        opened = [i for i, (old, new) in enumerate(zip(previous["chests"], snapshot["chests"])) if new[2] and not old[2]]
+        if opened:
+            frame["o"] = opened
+
+        return _encode(frame) if len(frame) > 2 else b""
+
+    def _queue(self, viewer: _Viewer, frame: bytes, is_keyframe: bool) -> None:
+        """Adds a frame to a viewer's queue, downsampling viewers that fell behind."""
+        if is_keyframe:
+            viewer.needs_keyframe = False
+        elif len(viewer.frames) >= self.max_pending_frames:
+            # Too far behind: drop queued frames (keep a partly sent one) and resync next tick
+            head = viewer.frames.popleft() if viewer.offset else None
+            viewer.frames.clear()
+            if head is not None:
+                viewer.frames.append(head)
+            viewer.needs_keyframe = True
+            viewer.resyncs += 1
+            if viewer.resyncs > self.max_resyncs:
+                # Closed by the network thread, which owns the selector
+                viewer.frames.clear()
+                self._pending_drops.append(viewer)
+            return
+        viewer.frames.append(frame)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass # Already awake or shutting down
+
+    # --- Network thread side ---
+
+    def _serve(self) -> None:
+        """Accepts viewers and flushes their queues until close()."""
+        self._selector.register(self._listener, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_recv, selectors.EVENT_READ, "wake")
+        while self._running:
+            self._update_interest()
+            for key, events in self._selector.select(timeout=0.5):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    try:
+                        while self._wake_recv.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                else:
+                    with self._lock:
+                        viewer = self._viewers.get(key.fileobj)
+                        if viewer is None:
+                            continue
+                        if events & selectors.EVENT_READ:
+                            self._read(viewer)
+                        if events & selectors.EVENT_WRITE and viewer.sock in self._viewers:
+                            self._flush(viewer)
+
+    def _update_interest(self) -> None:
+        """Only waits for writability on viewers with queued frames."""
+        with self._lock:
+            for viewer in self._pending_drops:
+                self._drop(viewer)
+            self._pending_drops.clear()
+            for sock, viewer in self._viewers.items():
+                events = selectors.EVENT_READ | (selectors.EVENT_WRITE if viewer.frames else 0)
+                self._selector.modify(sock, events, "viewer")
+
+    def _accept(self) -> None:
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        viewer = _Viewer(sock)
+        with self._lock:
+            self._viewers[sock] = viewer
+            self._selector.register(sock, selectors.EVENT_READ, "viewer")
+            # Late joiners get the current view right away instead of waiting for the next turn
+            if self._last is not None:
+                self._queue(viewer, self._keyframe(self._last), is_keyframe=True)
+
+    def _read(self, viewer: _Viewer) -> None:
+        """Viewers never send anything meaningful; reading only detects disconnects."""
+        try:
+            if not viewer.sock.recv(4096):
+                self._drop(viewer)
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(viewer)
+
+    def _flush(self, viewer: _Viewer) -> None:
+        """Sends as much of the queue as the socket accepts without blocking."""
+        while viewer.frames:
+            frame = viewer.frames[0]
+            try:
+                sent = viewer.sock.send(frame[viewer.offset:])
+            except BlockingIOError:
+                return
+            except OSError:
+                self._drop(viewer)
+                return
+            viewer.offset += sent
+            if viewer.offset < len(frame):
+                return
+            viewer.frames.popleft()
+            viewer.offset = 0
+        viewer.resyncs = 0 # Caught up
+
+    def _drop(self, viewer: _Viewer) -> None:
+        """Disconnects a viewer (caller holds the lock)."""
+        self._viewers.pop(viewer.sock, None)
+        try:
+            self._selector.unregister(viewer.sock)
+        except (KeyError, ValueError):
+            pass
+        viewer.sock.close()
+
+# --- Viewer client ---
+
+def render_view(view: Dict[str, Any]) -> str:
+    """Renders a spectator's view like print_grid does."""
+    grid = [[MAP_SYMBOLS.get(int(v), '?') for v in row] for row in view["map"]]
+    for y, x, opened in view["chests"]:
+        if not opened:
+            grid[y][x] = 'C'
+    for y, x, health in view["enemies"]:
+        if health > 0:
+            grid[y][x] = 'E'
+    py, px, health, max_health = view["player"]
+    grid[py][px] = 'P'
+    header = f"Level: {view['level']} | Health: {health}/{max_health} | Tick: {view['tick']}"
+    return header + "\n" + "\n".join(' '.join(row) for row in grid)
+
+def apply_frame(view: Dict[str, Any], frame: Dict[str, Any]) -> Dict[str, Any]:
+    """Applies a keyframe or delta to a viewer's local copy of the game."""
+    if frame["t"] == FRAME_KEYFRAME:
+        map_bytes = zlib.decompress(base64.b64decode(frame["map"]))
+        view = {
+            "level": frame["level"],
+            "map": np.frombuffer(map_bytes, dtype=np.uint8).reshape(frame["shape"]),
+            "player": frame["player"],
+            "enemies": frame["enemies"],
+            "chests": frame["chests"],
+        }
+    else:
+        if "p" in frame:
+            view["player"] = frame["p"]
+        for i, y, x in frame.get("m", []):
+            view["enemies"][i][0], view["enemies"][i][1] = y, x
+        for i, health in frame.get("h", []):
+            view["enemies"][i][2] = health
+        for i in frame.get("o", []):
+            view["chests"][i][2] = True
+    view["tick"] = frame["tick"]
+    return view
+
+def watch(host: str = "127.0.0.1", port: int = 0) -> None:
+    """Attaches to a spectator server and draws the game as it is played."""
+    view: Optional[Dict[str, Any]] = None
+    with socket.create_connection((host, port)) as sock:
+        for line in sock.makefile('rb'):
+            frame = json.loads(line)
+            if view is None and frame["t"] != FRAME_KEYFRAME:
+                continue # Wait for the first keyframe
+            view = apply_frame(view or {}, frame)
+            clear_terminal()
+            print(render_view(view))
+    print("The session has ended.")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python spectator.py PORT [HOST]")
+    else:
+        watch(sys.argv[2] if len(sys.argv) > 2 else "127.0.0.1", int(sys.argv[1]))
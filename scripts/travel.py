@@ -0,0 +1,68 @@
+from typing import Iterable, List, Optional, Set, Tuple
+import numpy as np # type: ignore
+import numpy.typing as npt # type: ignore
+from game_data import GameState
+from levelgenerator import bfs_distances
+
+# Direction commands for each (dy, dx) step, as understood by Player.move
+STEP_COMMANDS: Tuple[Tuple[int, int, str], ...] = ((-1, 0, 'W'), (1, 0, 'S'), (0, -1, 'A'), (0, 1, 'D'))
+
+def find_path(dungeon_map: npt.NDArray[np.int_], start: Tuple[int, int], goals: Iterable[Tuple[int, int]],
+              blocked: Iterable[Tuple[int, int]] = ()) -> Optional[List[str]]:
+    """Returns the W/A/S/D commands of a shortest path from start to the nearest goal, or None.
+
+    Walls and blocked tiles are impassable. The entrance (2) and exit (4) trigger events when
+    stepped on, so they are only entered when they are the goal. Distances are flooded out
+    from the goals with a vectorized BFS, then the path is read off by walking downhill.
+    """
+    height, width = dungeon_map.shape
+    goal_list = [(int(y), int(x)) for y, x in goals if dungeon_map[y, x] != 0]
+    if not goal_list:
+        return None
+    start = (int(start[0]), int(start[1]))
+
+    passable = (dungeon_map == 1) | (dungeon_map == 3)
+    for y, x in blocked:
+        passable[y, x] = False
+    for y, x in goal_list:
+        passable[y, x] = True
+    passable[start] = True
+
+    dist = bfs_distances(passable, goal_list, stop_at=start)
+    remaining = int(dist[start])
+    if remaining < 0:
+        return None
+
+    commands: List[str] = []
+    y, x = start
+    while remaining > 0:
+        for dy, dx, command in STEP_COMMANDS:
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < height and 0 <= nx < width and dist[ny, nx] == remaining - 1:
+                commands.append(command)
+                y, x = ny, nx
+                remaining -= 1
+                break
+    return commands
+
+def living_enemy_tiles(state: GameState) -> Set[Tuple[int, int]]:
+    return {(e.y, e.x) for e in state.enemies if e.health > 0}
+
+def enemy_adjacent(state: GameState) -> bool:
+    """True if a living enemy is next to (or on) the player."""
+    py, px = state.player.y, state.player.x
+    return any(abs(e.y - py) + abs(e.x - px) <= 1 for e in state.enemies if e.health > 0)
+
+def explore_goals(state: GameState) -> List[Tuple[int, int]]:
+    """Points of interest for auto-explore: unopened chests, tiles next to living enemies, then the exit."""
+    goals = [(c.y, c.x) for c in state.chests if not c.opened]
+    enemies = living_enemy_tiles(state)
+    height, width = state.dungeon_map.shape
+    for ey, ex in enemies:
+        for dy, dx, _ in STEP_COMMANDS:
+            ny, nx = ey + dy, ex + dx
+            if 0 <= ny < height and 0 <= nx < width and state.dungeon_map[ny, nx] == 1 and (ny, nx) not in enemies:
+                goals.append((ny, nx))
+    if not goals and not enemies:
+        goals = [tuple(t) for t in np.argwhere(state.dungeon_map == 4)]
+    return goals